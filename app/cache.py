@@ -0,0 +1,107 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from app import constants, metrics_setup
+
+# --- 1. DATASET VERSION ---
+# Published in the database by every successful sync (app.coordination) and
+# adopted by each replica. Cached responses are keyed on it, so a new
+# version makes every previously rendered body unreachable.
+_version_lock = threading.Lock()
+_dataset_version = 0
+
+
+def current_version() -> int:
+    return _dataset_version
+
+
+def adopt_version(version: int) -> bool:
+    """
+    Switches to the given dataset version; drops the now stale cache entries
+    if it differs from ours. Returns True when it changed.
+    """
+    global _dataset_version
+    with _version_lock:
+        if version == _dataset_version:
+            return False
+        _dataset_version = version
+    response_cache.clear()
+    return True
+
+
+def adopt_newer_version(version: int) -> bool:
+    """
+    Adopts a version read together with data if it is ahead of ours (a
+    sync committed before the health monitor noticed).
+    """
+    with _version_lock:
+        if version <= _dataset_version:
+            return False
+    return adopt_version(version)
+
+
+# --- 2. CONDITIONAL REQUESTS (ETag) ---
+def etag_for(version: int | None, *parts) -> str | None:
+    """
+    Strong ETag for a dataset version plus request parameters; the version
+    must be the one the body was read at. Versions are shared, so every
+    replica hands out the same ETags. None without a version.
+    """
+    if version is None:
+        return None
+    raw = "|".join([str(version), *map(str, parts)])
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:24] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match uses weak comparison, so a W/ prefix is ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+# --- 3. RESPONSE CACHE ---
+class ResponseCache:
+    """
+    Bounded, process-local LRU of fully encoded response bodies.
+    Keys are (dataset_version, variant) tuples; values are bodies, or
+    (body, content coding) pairs for content-coded variants.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> bytes | tuple | None:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                metrics_setup.RESPONSE_CACHE_MISSES.inc()
+                return None
+            self._entries.move_to_end(key)
+        metrics_setup.RESPONSE_CACHE_HITS.inc()
+        return body
+
+    def put(self, key, body: bytes | tuple):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics_setup.RESPONSE_CACHE_EVICTIONS.inc()
+
+    def clear(self):
+        with self._lock:
+            metrics_setup.RESPONSE_CACHE_EVICTIONS.inc(len(self._entries))
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache(constants.RESPONSE_CACHE_MAX_ENTRIES)
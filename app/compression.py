@@ -0,0 +1,83 @@
+import gzip
+
+from app import constants, metrics_setup, profiling
+
+try:
+    import brotli
+except ImportError: # Optional: without it only gzip is offered
+    brotli = None
+
+
+# --- 1. CONTENT NEGOTIATION ---
+def supported_encodings() -> list[str]:
+    """Encodings this process can produce, most preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def _weights(accept_encoding: str) -> dict[str, float]:
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """
+    Picks the content coding for an Accept-Encoding header: the highest
+    q-value among the supported ones, ties going to our preference (br).
+    None means identity.
+    """
+    if not accept_encoding:
+        return None
+    weights = _weights(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in supported_encodings():
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+# --- 2. ENCODING ---
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compresses a body and records the achieved ratio."""
+    with profiling.phase("compress"):
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=constants.BROTLI_QUALITY)
+        else:
+            # mtime=0 keeps the output byte-identical across replicas and runs
+            compressed = gzip.compress(body, constants.GZIP_LEVEL, mtime=0)
+    metrics_setup.COMPRESSION_RATIO.labels(encoding=encoding).observe(
+        len(compressed) / len(body)
+    )
+    return compressed
+
+
+def encode(body: bytes, encoding: str | None) -> tuple[bytes, str | None]:
+    """
+    Returns (body, encoding actually applied): bodies under
+    COMPRESSION_MIN_SIZE stay identity, where the overhead is not worth it.
+    """
+    if encoding is None or len(body) < constants.COMPRESSION_MIN_SIZE:
+        return body, None
+    return compress(body, encoding), encoding
+
+
+def record(body: bytes, encoding: str | None):
+    """Counts the bytes of one served response by content coding."""
+    metrics_setup.RESPONSE_BODY_BYTES.labels(encoding=encoding or "identity").inc(
+        len(body)
+    )
+
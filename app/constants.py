@@ -18,3 +18,105 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     print("WARNING: DATABASE_URL not set. Falling back to local 'sqlite:///./test.db'")
     DATABASE_URL = "sqlite:///./test.db"
+
+# 3. Connection pool sizing (applies per engine; each pod runs a sync engine for
+#    ingestion and an async engine for the request path).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# --- INGESTION CONFIG ---
+# Max number of upstream pages fetched in parallel during a sync.
+# A value of 1 keeps the classic sequential 'info.next' walk.
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "4"))
+# Number of characters written per set-based upsert (one transaction each).
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "500"))
+# Incremental sync: only write rows whose content fingerprint changed.
+SYNC_INCREMENTAL = os.getenv("SYNC_INCREMENTAL", "true").lower() == "true"
+# Mark characters that disappeared upstream as deleted (tombstones).
+SYNC_TOMBSTONE_MISSING = os.getenv("SYNC_TOMBSTONE_MISSING", "false").lower() == "true"
+# Lease on the lock-table fallback (non-Postgres) for the cross-replica sync
+# lock; must outlast a full sync. Postgres uses an advisory lock instead.
+SYNC_LOCK_TTL = float(os.getenv("SYNC_LOCK_TTL", "900"))
+# Capacity of each queue between ingestion stages (pages, then row batches);
+# a full queue blocks the stage in front of it (backpressure).
+SYNC_QUEUE_SIZE = int(os.getenv("SYNC_QUEUE_SIZE", "8"))
+# Seconds sync job statuses are kept in the shared sync_jobs table.
+SYNC_JOB_RETENTION = float(os.getenv("SYNC_JOB_RETENTION", "86400"))
+
+# --- SYNC SCHEDULER ---
+# Seconds between in-process scheduled syncs; 0 disables the scheduler.
+SYNC_SCHEDULE_INTERVAL = float(os.getenv("SYNC_SCHEDULE_INTERVAL", "0"))
+# Random +/- fraction applied to every delay so replicas do not fire together.
+SYNC_SCHEDULE_JITTER = float(os.getenv("SYNC_SCHEDULE_JITTER", "0.1"))
+# Upper bound for the interval once stretched by upstream backoff or idle syncs.
+SYNC_SCHEDULE_MAX_INTERVAL = float(os.getenv("SYNC_SCHEDULE_MAX_INTERVAL", "21600"))
+
+# --- API RESPONSE CACHE ---
+# Max number of pre-encoded /api/v1/characters bodies kept in memory.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "16"))
+# Pre-render the listing variants during application startup.
+RESPONSE_CACHE_WARM = os.getenv("RESPONSE_CACHE_WARM", "true").lower() == "true"
+
+# --- RATE LIMITING ---
+# Where limit counters live: "database://" shares them across replicas
+# through the app database; "memory://" is per process; "redis://host:6379"
+# works if the redis package is installed.
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "database://")
+# Share of a limit a replica claims from the shared counters at once; hits
+# within the claim are decided locally (0.1 of 120/minute = 12 per claim).
+RATE_LIMIT_LEASE_FRACTION = float(os.getenv("RATE_LIMIT_LEASE_FRACTION", "0.1"))
+# Smallest block claimed, so small limits are not one round-trip per hit
+# (capped at the limit itself: 5/minute is claimed in one go).
+RATE_LIMIT_LEASE_MIN = int(os.getenv("RATE_LIMIT_LEASE_MIN", "5"))
+
+# --- RESPONSE COMPRESSION ---
+# Bodies smaller than this (bytes) are sent uncompressed.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Full listings are compressed once per dataset version and cached;
+# paginated pages are compressed per request with the same levels.
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# --- PAGINATION ---
+# Page size when a client sends a cursor without a limit, and the upper bound.
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+# Rows fetched per server-side cursor round-trip by the streaming export.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+# --- SEARCH ---
+# Default and maximum number of results returned by /api/v1/characters/search.
+SEARCH_LIMIT_DEFAULT = int(os.getenv("SEARCH_LIMIT_DEFAULT", "10"))
+SEARCH_LIMIT_MAX = int(os.getenv("SEARCH_LIMIT_MAX", "50"))
+
+# --- HEALTH MONITOR & CIRCUIT BREAKER ---
+# The DB is probed in the background; /healthcheck answers from the cache.
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "5"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+# A cached result older than this is re-probed inline (monitor stalled).
+HEALTH_MAX_STALENESS = float(os.getenv("HEALTH_MAX_STALENESS", "30"))
+# Consecutive failed probes before read endpoints start failing fast.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+# Seconds the breaker stays open before letting requests through again.
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+# --- UPSTREAM HTTP CLIENT ---
+# Keep-alive connections kept per upstream host (>= SYNC_CONCURRENCY).
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "10"))
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "10"))
+# On-disk conditional (ETag / Last-Modified) page cache. Empty disables it.
+UPSTREAM_CACHE_DIR = os.getenv("UPSTREAM_CACHE_DIR", "/tmp/rick-morty-upstream-cache")
+
+# --- PROFILING (opt-in) ---
+# Allows cProfile captures of single requests / sync jobs (see README).
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# If set, the X-Profile request header must carry this value.
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+# Fraction of requests profiled without the header (0 = header only).
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", "/tmp/rick-morty-profiles")
+# Number of most recent profile artifacts kept on disk.
+PROFILING_MAX_ARTIFACTS = int(os.getenv("PROFILING_MAX_ARTIFACTS", "20"))
@@ -0,0 +1,226 @@
+import os
+import socket
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import cache, constants, database
+from app.database import SyncState
+
+# Identifies this process in the shared lock row (pod name + worker pid)
+REPLICA_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Name of the sync_state row for the character dataset
+STATE_ROW = "characters"
+
+# Arbitrary constant key for the Postgres advisory lock guarding ingestion
+# (distinct from the migrations lock key)
+SYNC_LOCK_KEY = 720_102
+
+
+# --- 1. SHARED STATE ROW ---
+def ensure_sync_state(conn):
+    """Creates the sync_state row if missing (no-op when it exists)."""
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    # Seeding from the clock keeps versions (and so ETags) from repeating
+    # if the database is ever recreated from scratch
+    conn.execute(
+        insert(SyncState)
+        .values(name=STATE_ROW, dataset_version=int(time.time()))
+        .on_conflict_do_nothing(index_elements=[SyncState.name])
+    )
+
+
+def init_sync_state():
+    """Called from the application lifespan: adopts the published version."""
+    with database.engine.begin() as conn:
+        ensure_sync_state(conn)
+        version = conn.execute(_version_query()).scalar_one()
+    cache.adopt_version(version)
+
+
+def _version_query():
+    return select(SyncState.dataset_version).where(SyncState.name == STATE_ROW)
+
+
+# --- 2. DATASET VERSION ---
+# Bracketing a read between two lookups of the version ties it to one
+# version on any isolation level: character writes commit together with
+# their bump, so an unchanged version means none committed in between.
+VERSIONED_READ_ATTEMPTS = 3
+
+
+def bump_dataset_version(db):
+    """
+    Bumps the shared dataset version inside the caller's transaction, so
+    the new rows and their version become visible together. Passed as
+    'before_commit' to the character writes of a sync.
+    """
+    db.execute(
+        update(SyncState)
+        .where(SyncState.name == STATE_ROW)
+        .values(dataset_version=SyncState.dataset_version + 1)
+    )
+
+
+def adopt_published_version() -> int:
+    """
+    Adopts the version published by this process's own writes after a
+    sync. Other replicas pick it up on their next refresh.
+    """
+    with database.engine.connect() as conn:
+        version = conn.execute(_version_query()).scalar_one()
+    cache.adopt_version(version)
+    return version
+
+
+async def read_dataset_version(db) -> int | None:
+    """The published version (one primary-key lookup)."""
+    return (await db.execute(_version_query())).scalar_one_or_none()
+
+
+async def versioned_read(db, read):
+    """
+    Awaits 'read()' between two lookups of the published version and
+    returns (version, result). The version is None if syncs kept
+    committing meanwhile; the result is then not tied to any version.
+    """
+    for _ in range(VERSIONED_READ_ATTEMPTS):
+        before = await read_dataset_version(db)
+        result = await read()
+        if await read_dataset_version(db) == before:
+            return before, result
+    return None, result
+
+
+def versioned_read_sync(db, read):
+    """versioned_read() for sync sessions (worker threads)."""
+    for _ in range(VERSIONED_READ_ATTEMPTS):
+        before = db.execute(_version_query()).scalar_one_or_none()
+        result = read()
+        if db.execute(_version_query()).scalar_one_or_none() == before:
+            return before, result
+    return None, result
+
+
+async def refresh_dataset_version() -> int | None:
+    """
+    Reads the published version (one primary-key lookup) and drops local
+    caches if another replica synced since. Run on the health probe cadence.
+    """
+    async with database.async_engine.connect() as conn:
+        version = (await conn.execute(_version_query())).scalar_one_or_none()
+    if version is not None:
+        cache.adopt_version(version)
+    return version
+
+
+# --- 2.1. LAST SUCCESSFUL SYNC ---
+def record_successful_sync():
+    """Stamps sync_state with the time a sync (by any process) succeeded."""
+    with database.engine.begin() as conn:
+        conn.execute(
+            update(SyncState)
+            .where(SyncState.name == STATE_ROW)
+            .values(last_synced_at=time.time())
+        )
+
+
+def last_successful_sync() -> float | None:
+    """Unix time of the last successful sync in the cluster, if any."""
+    with database.engine.connect() as conn:
+        return conn.execute(
+            select(SyncState.last_synced_at).where(SyncState.name == STATE_ROW)
+        ).scalar_one_or_none()
+
+
+# --- 3. CROSS-REPLICA SYNC LOCK ---
+@contextmanager
+def sync_lock():
+    """
+    Yields True if this process now holds the cluster-wide sync lock, False
+    if another replica does. Postgres uses a session-level advisory lock on a
+    dedicated connection (released if the pod dies); other databases use a
+    lease on the sync_state row that expires after SYNC_LOCK_TTL.
+    """
+    engine = database.engine
+    if engine.dialect.name != "postgresql":
+        acquired = _claim_lease(engine)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _release_lease(engine)
+        return
+
+    with engine.connect() as lock_conn:
+        acquired = lock_conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": SYNC_LOCK_KEY}
+        ).scalar()
+        lock_conn.commit()
+        try:
+            if acquired:
+                # Informational only on Postgres: lets others report who syncs
+                _claim_lease(engine, force=True)
+            yield acquired
+        finally:
+            if acquired:
+                _release_lease(engine)
+                lock_conn.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": SYNC_LOCK_KEY}
+                )
+                lock_conn.commit()
+
+
+def _claim_lease(engine, force: bool = False) -> bool:
+    now = time.time()
+    statement = update(SyncState).where(SyncState.name == STATE_ROW)
+    if not force:
+        statement = statement.where(or_(
+            SyncState.lock_holder.is_(None),
+            SyncState.lock_holder == REPLICA_ID,
+            SyncState.lock_expires_at < now,
+        ))
+    with engine.begin() as conn:
+        ensure_sync_state(conn)
+        result = conn.execute(statement.values(
+            lock_holder=REPLICA_ID,
+            lock_expires_at=now + constants.SYNC_LOCK_TTL,
+        ))
+    return result.rowcount == 1
+
+
+def _release_lease(engine):
+    with engine.begin() as conn:
+        conn.execute(
+            update(SyncState)
+            .where(SyncState.name == STATE_ROW, SyncState.lock_holder == REPLICA_ID)
+            .values(lock_holder=None, lock_expires_at=None)
+        )
+
+
+async def sync_lock_holder() -> str | None:
+    """Who currently holds the sync lock (None if nobody)."""
+    async with database.async_engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            held = (await conn.execute(
+                text(
+                    "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE"
+                    " locktype = 'advisory' AND granted AND classid = 0"
+                    " AND objid = :key AND objsubid = 1)"
+                ),
+                {"key": SYNC_LOCK_KEY},
+            )).scalar()
+            if not held:
+                return None
+        row = (await conn.execute(
+            select(SyncState.lock_holder, SyncState.lock_expires_at)
+            .where(SyncState.name == STATE_ROW)
+        )).first()
+    if row is None or row.lock_holder is None:
+        return None
+    if conn.dialect.name != "postgresql" and row.lock_expires_at < time.time():
+        return None
+    return row.lock_holder
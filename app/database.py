@@ -1,21 +1,117 @@
-from sqlalchemy import Boolean, Column, Integer, String, create_engine, text
+import hashlib
+import json
+import time
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    Float,
+    Index,
+    Integer,
+    String,
+    Text,
+    create_engine,
+    false,
+    text,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 # --- FIX: Import 'declarative_base' from 'sqlalchemy.orm' ---
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app import constants, metrics_setup
 
 # Load constants
-from app.constants import DATABASE_URL
+from app.constants import DATABASE_URL, UPSERT_BATCH_SIZE
 
 # --- 1. BASE DECLARATION AND ENGINE SETUP ---
 Base = declarative_base() # Now uses the correct ORM import
 
+
+# --- 1.1. CONNECTION POOLS ---
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection."""
+
+    metrics_name = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics_setup.DB_POOL_CHECKOUT_WAIT.labels(
+                pool=self.metrics_name
+            ).observe(time.perf_counter() - start)
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+
+def pool_options(url: str, poolclass) -> dict:
+    """
+    create_engine() pool arguments from the DB_POOL_* settings.
+    SQLite keeps SQLAlchemy's default pool (sizing is meaningless there).
+    """
+    options = {
+        "pool_pre_ping": constants.DB_POOL_PRE_PING,
+        "pool_recycle": constants.DB_POOL_RECYCLE,
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=poolclass,
+            pool_size=constants.DB_POOL_SIZE,
+            max_overflow=constants.DB_MAX_OVERFLOW,
+            pool_timeout=constants.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
 # The engine manages connections to the database.
-engine = create_engine(DATABASE_URL)
+engine = create_engine(
+    DATABASE_URL, **pool_options(DATABASE_URL, InstrumentedQueuePool)
+)
+metrics_setup.instrument_engine(engine, "sync")
 
 # SessionLocal is the class for creating new session objects.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def async_database_url(url: str) -> str:
+    """
+    Maps a sync DATABASE_URL to its async driver equivalent:
+    asyncpg for Postgres, aiosqlite for SQLite.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        query = dict(parsed.query)
+        # asyncpg does not understand libpq's 'sslmode', it takes 'ssl'
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(drivername="postgresql+asyncpg", query=query)
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+# The async engine serves the request path without blocking the event loop.
+# Ingestion keeps using the sync engine above (it runs on a worker thread).
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **pool_options(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool)
+)
+metrics_setup.instrument_engine(async_engine.sync_engine, "async")
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
 # --- 2. DATA MODEL: Character Table ---
 class Character(Base):
     """
@@ -31,21 +127,113 @@ class Character(Base):
     is_earth_origin = Column(
         Boolean
     ) # Flag to simplify filtering logic (SRE efficiency)
+    # Fingerprint of the public fields, used by incremental sync to skip
+    # rows that did not change upstream
+    content_hash = Column(String(40))
+    # Tombstone for characters that disappeared upstream
+    is_deleted = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    # Composite indexes matching the listing query: equality on the filter
+    # columns, then the sort key, so the DB can walk the index in order
+    # instead of filtering and sorting. On Postgres, INCLUDE makes them
+    # covering (index-only scans).
+    __table_args__ = (
+        Index(
+            "ix_characters_listing_name",
+            species, status, is_earth_origin, is_deleted, name, id,
+            postgresql_include=["origin_name"],
+        ),
+        Index(
+            "ix_characters_listing_id",
+            species, status, is_earth_origin, is_deleted, id,
+            postgresql_include=["name", "origin_name"],
+        ),
+    )
+
+
+# --- 2.1. DATA MODEL: Shared Sync State ---
+class SyncState(Base):
+    """
+    One row per synced dataset, shared by every replica: the published
+    dataset version (for cache invalidation), when a sync last succeeded
+    and the holder of the sync lock on databases without advisory locks.
+    """
+    __tablename__ = "sync_state"
+
+    name = Column(String, primary_key=True)
+    dataset_version = Column(BigInteger, nullable=False)
+    last_synced_at = Column(Float) # Unix time; None until a sync succeeds
+    lock_holder = Column(String)
+    lock_expires_at = Column(Float)
+
+
+# --- 2.2. DATA MODEL: Shared Rate-Limit Counters ---
+class RateLimitCounter(Base):
+    """
+    Hit counters of the API rate limiter, one row per limit key and window,
+    shared by every replica (see app.ratelimit).
+    """
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String, primary_key=True)
+    hits = Column(Integer, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)
+
+
+# --- 2.3. DATA MODEL: Sync Jobs ---
+class SyncJobRecord(Base):
+    """
+    Status of a sync job as last reported by the process running it, so
+    any worker or replica can answer GET /sync/{job_id} (see app.sync_jobs).
+    """
+    __tablename__ = "sync_jobs"
+
+    id = Column(String, primary_key=True)
+    replica = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    pages_done = Column(Integer, nullable=False)
+    rows_written = Column(Integer, nullable=False)
+    started_at = Column(Float) # Wall clock; None until the job runs
+    finished_at = Column(Float)
+    result = Column(JSON)
+    error = Column(Text)
+    phases_ms = Column(JSON)
+    profile_id = Column(String)
+    created_at = Column(Float, nullable=False, index=True)
+
+
+# Columns exposed by the API (internal bookkeeping columns stay private)
+PUBLIC_COLUMNS = (
+    Character.id,
+    Character.name,
+    Character.species,
+    Character.status,
+    Character.origin_name,
+    Character.is_earth_origin,
+)
+
+
+def character_fingerprint(row: dict) -> str:
+    """Stable content hash of a character's public fields."""
+    payload = json.dumps(
+        [row[column.key] for column in PUBLIC_COLUMNS], separators=(",", ":")
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
 
 
 # --- 3. SRE HELPER FUNCTIONS ---
 
-def check_db_connection() -> bool:
+async def check_db_connection() -> bool:
     """
     Checks for an active database connection.
     This is CRITICAL for the /healthcheck endpoint and the K8s Readiness Probe.
     """
     try:
         # Attempt a simple query execution to confirm the DB is responsive
-        db: Session = SessionLocal()
-        # Using text() ensures compatibility with raw SQL execution
-        db.execute(text("SELECT 1"))
-        db.close()
+        # (a pooled connection is enough, no ORM session needed)
+        async with async_engine.connect() as conn:
+            # Using text() ensures compatibility with raw SQL execution
+            await conn.execute(text("SELECT 1"))
         return True
     except Exception as e:
         # Log the failure, this is important for debugging
@@ -53,6 +241,77 @@ def check_db_connection() -> bool:
         return False
 
 
+def bulk_upsert_characters(
+    db: Session, characters: list[dict], batch_size: int | None = None,
+    before_commit=None,
+) -> int:
+    """
+    Writes character dicts with one set-based upsert per batch.
+    Uses INSERT ... ON CONFLICT (id) DO UPDATE (Postgres and SQLite both
+    support it), and commits each batch in a single transaction.
+    'before_commit(db)' runs inside each of those transactions.
+    Returns the number of rows written.
+    """
+    if batch_size is None:
+        batch_size = UPSERT_BATCH_SIZE
+
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        insert = postgresql.insert
+    elif dialect_name == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise ValueError(f"Bulk upsert is not supported for '{dialect_name}'")
+
+    table = Character.__table__
+    written = 0
+    for start in range(0, len(characters), batch_size):
+        # ON CONFLICT cannot touch the same row twice in one statement,
+        # so keep only the last version of each id within the batch.
+        batch = list({
+            row["id"]: row for row in characters[start:start + batch_size]
+        }.values())
+
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={
+                column: stmt.excluded[column]
+                for column in batch[0]
+                if column != "id"
+            },
+        )
+        db.execute(stmt, batch)
+        if before_commit is not None:
+            before_commit(db)
+        db.commit()
+        written += len(batch)
+    return written
+
+
+def load_fingerprints(db: Session) -> dict[int, tuple[str | None, bool]]:
+    """Loads {id: (content_hash, is_deleted)} for all stored characters in one query."""
+    rows = db.query(Character.id, Character.content_hash, Character.is_deleted)
+    return {char_id: (fingerprint, deleted) for char_id, fingerprint, deleted in rows}
+
+
+def tombstone_characters(
+    db: Session, character_ids: list[int], before_commit=None
+) -> int:
+    """Marks the given characters as deleted. Returns the number of rows touched."""
+    if not character_ids:
+        return 0
+    db.execute(
+        update(Character)
+        .where(Character.id.in_(character_ids))
+        .values(is_deleted=True)
+    )
+    if before_commit is not None:
+        before_commit(db)
+    db.commit()
+    return len(character_ids)
+
+
 def init_db():
     """
     Creates the database tables if they do not already exist.
@@ -69,3 +328,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Async counterpart of get_db for the request path.
+    The session only connects on its first query.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,29 @@
+# Gunicorn settings for running several uvicorn workers in one pod.
+# Used by docker-entrypoint.sh when WEB_CONCURRENCY > 1.
+import os
+import shutil
+
+# --- 1. WORKERS ---
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# --- 2. PROMETHEUS MULTIPROCESS MODE ---
+# Must be in the environment before any worker imports prometheus_client.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-multiproc")
+
+
+def on_starting(server):
+    """Wipes metric files left over from a previous run of this container."""
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drops the live gauges of a dead worker so they stop being aggregated."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+from app import constants, coordination, database, metrics_setup
+
+# Breaker states (values double as the metric encoding)
+CLOSED = 0
+HALF_OPEN = 1
+OPEN = 2
+STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half-open", OPEN: "open"}
+
+
+# --- 1. CIRCUIT BREAKER ---
+class CircuitBreaker:
+    """
+    Opens after N consecutive failed DB probes so read endpoints fail fast
+    with 503 instead of each waiting on connection timeouts. After the reset
+    timeout it lets traffic through again (half-open); the next probe then
+    closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        metrics_setup.DB_CIRCUIT_BREAKER_STATE.set(CLOSED)
+
+    @property
+    def state(self) -> int:
+        open_for = time.monotonic() - self._opened_at
+        if self._state == OPEN and open_for >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def allow_request(self) -> bool:
+        return self.state != OPEN
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._set_state(CLOSED)
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        tripped = self.consecutive_failures >= self.failure_threshold
+        if self._state == HALF_OPEN or tripped:
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def _set_state(self, state: int):
+        if state != self._state:
+            old, new = STATE_NAMES[self._state], STATE_NAMES[state]
+            print(f"DB circuit breaker: {old} -> {new}")
+        self._state = state
+        metrics_setup.DB_CIRCUIT_BREAKER_STATE.set(state)
+
+
+# --- 2. BACKGROUND HEALTH MONITOR ---
+class HealthMonitor:
+    """
+    Probes the DB on its own schedule and caches the last result, so
+    /healthcheck answers from memory instead of hitting the DB per probe.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, interval: float, timeout: float):
+        self.breaker = breaker
+        self.interval = interval
+        self.timeout = timeout
+        self.healthy = None # Unknown until the first probe
+        self.checked_at = 0.0
+        self._task = None
+        self._stopping = None
+        # Optional coroutine run after each version refresh (set by the app)
+        self.on_refresh = None
+
+    async def probe_once(self) -> bool:
+        start = time.perf_counter()
+        try:
+            healthy = await asyncio.wait_for(
+                database.check_db_connection(), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"Database health probe timed out after {self.timeout}s")
+            healthy = False
+        metrics_setup.DB_HEALTH_PROBE_LATENCY.labels(
+            result="success" if healthy else "failure"
+        ).observe(time.perf_counter() - start)
+
+        if healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        self.healthy = healthy
+        self.checked_at = time.monotonic()
+        return healthy
+
+    def age(self) -> float:
+        return time.monotonic() - self.checked_at
+
+    async def current_status(self) -> bool:
+        """Cached health; probes inline only if no fresh result exists."""
+        if self.healthy is None or self.age() > constants.HEALTH_MAX_STALENESS:
+            return await self.probe_once()
+        return self.healthy
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if await self.probe_once():
+                    # Same cadence, one PK lookup: adopt syncs that other
+                    # replicas finished since the last probe
+                    await coordination.refresh_dataset_version()
+                    if self.on_refresh is not None:
+                        await self.on_refresh()
+            except Exception as e:
+                # Never let the monitor die; a stale cache is re-probed inline
+                print(f"Health monitor error: {e}")
+            # Sleep until the next probe, waking early on stop()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Lets an in-flight probe finish instead of cancelling it: a query
+        cancelled midway can leave its connection (and on SQLite, the file
+        lock) behind.
+        """
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+breaker = CircuitBreaker(
+    constants.BREAKER_FAILURE_THRESHOLD, constants.BREAKER_RESET_TIMEOUT
+)
+monitor = HealthMonitor(
+    breaker, constants.HEALTH_PROBE_INTERVAL, constants.HEALTH_PROBE_TIMEOUT
+)
@@ -1,19 +1,53 @@
-from contextlib import asynccontextmanager  # <-- NEW: for lifespan
+import asyncio
+import base64
+import binascii
+import csv
+import io
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import (  # <-- NEW: for lifespan
+    asynccontextmanager,
+    closing,
+    nullcontext,
+)
+from itertools import islice
 
-import requests
+import orjson
 from fastapi import Depends, FastAPI, HTTPException, Query
 
 # --- NEW: Imports for Rate Limiting ---
-from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response, StreamingResponse
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 # Import necessary local modules
-from app import constants, database, metrics_setup
+from app import (
+    cache,
+    compression,
+    constants,
+    coordination,
+    database,
+    health,
+    metrics_setup,
+    migrations,
+    pipeline,
+    profiling,
+    ratelimit,
+    scheduler,
+    search,
+    sync_jobs,
+    upstream,
+)
 from app.database import Character
 
 
@@ -23,22 +57,45 @@ async def lifespan(app: FastAPI):
     # Code to run on application startup
     print("--- Application starting up... ---")
     database.init_db()
+    migrations.run_migrations()
+    coordination.init_sync_state()
     print("--- Database initialized ---")
+    # Bound to this event loop, so created here rather than at import
+    app.state.search_index_lock = asyncio.Lock()
+    health.monitor.on_refresh = refresh_search_index
+    if constants.RESPONSE_CACHE_WARM:
+        await warm_characters_cache()
+        print("--- Response cache warmed ---")
+    health.monitor.start()
+    sync_scheduler.start()
 
     yield # Application runs here
 
     # Code to run on application shutdown (if needed)
     print("--- Application shutting down... ---")
+    await sync_scheduler.stop()
+    await health.monitor.stop()
+    sync_job_manager.shutdown()
+    await database.async_engine.dispose()
 
 
 # --- 2. INITIALIZATION and SRE MIDDLEWARE ---
 
 # --- NEW: Initialize Rate Limiter ---
-limiter = Limiter(key_func=get_remote_address)
+# Counters are shared across replicas (RATE_LIMIT_STORAGE_URI, see
+# app.ratelimit); if that storage fails, limits fall back to process memory
+limiter = ratelimit.TimedLimiter(
+    key_func=get_remote_address,
+    storage_uri=constants.RATE_LIMIT_STORAGE_URI,
+    strategy="sliding-window-counter",
+    in_memory_fallback_enabled=True,
+)
 
 app = FastAPI(
     title="Rick & Morty SRE App",
-    lifespan=lifespan  # <-- NEW: Modern way to handle startup/shutdown
+    lifespan=lifespan,  # <-- NEW: Modern way to handle startup/shutdown
+    # Reserves shared rate limit positions before slowapi's synchronous check
+    dependencies=[Depends(limiter.prepare)],
 )
 
 # --- NEW: Register limiter with the app ---
@@ -47,16 +104,13 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # 2.1. SRE: Initialize Prometheus Metrics and Middleware
 metrics_setup.setup_metrics(app)
+# 2.2. Opt-in request / sync profiling (PROFILING_ENABLED)
+profiling.setup_profiling(app)
 
 # Global Exception Handler
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(request: Request, exc: Exception):
-    # CRITICAL: Increment the global 500 error counter for observability
-    metrics_setup.HTTP_ERRORS_TOTAL.labels(
-        method=request.method,
-        endpoint=request.url.path,
-        status_code=500
-    ).inc()
+    # The 500 is counted by metrics_setup.MetricsMiddleware (route template label)
     print(f"Unhandled error: {exc}")
     # Return a generic 500 response
     return JSONResponse(status_code=500, content={"message": "Internal Server Error"})
@@ -69,133 +123,738 @@ async def deep_health_check():
     K8s Readiness Probe: Checks connectivity to critical dependencies (DB).
     If the DB fails (returns False), the 503 response will cause
     K8s to stop sending traffic to this pod.
+    The DB is probed by a background monitor; this answers from its cache.
     """
-    if not database.check_db_connection():
+    if not await health.monitor.current_status():
         raise HTTPException(status_code=503, detail="Database Connection Failed")
     return {"status": "OK", "db_status": "Healthy"}
 
 
+def require_db():
+    """Fails fast with 503 while the DB circuit breaker is open."""
+    if not health.breaker.allow_request():
+        raise HTTPException(
+            status_code=503, detail="Database unavailable (circuit open)"
+        )
+
+
 # --- 4. RESILIENCE: Retry Logic ---
 @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=2, max=10))
 def resilient_request(url: str) -> dict:
-    """Makes a GET request with retry logic for transient failures (429/5xx)."""
-    response = requests.get(url, params=constants.EXTERNAL_FILTERS, timeout=10)
-
-    # Retry on 429 (Rate Limit) or 5xx (Server Error)
-    if response.status_code >= 429:
-        err_msg = f"External API failed with status {response.status_code}. Retrying..."
-        raise Exception(err_msg)
-
-    # Fail fast on other 4xx client errors
-    response.raise_for_status()
-    return response.json()
+    """
+    Makes a GET request with retry logic for transient failures (429/5xx).
+    Goes through the shared keep-alive client, which revalidates pages it
+    has seen before with If-None-Match / If-Modified-Since.
+    """
+    return upstream.client.get_json(url, params=constants.EXTERNAL_FILTERS)
 
 
 # --- 5. DATA INGESTION JOB ---
-def ingest_all_characters(db: Session):
-    """Collects all pages of filtered data from the external API and persists them."""
-    next_url = constants.EXTERNAL_API_URL
-    processed_count = 0
+def fetch_character_pages(concurrency: int | None = None):
+    """
+    Yields every page of the external API, always in page order.
+
+    The first page tells us how many pages exist ('info.pages'); the rest are
+    then fetched in parallel by a bounded worker pool. Every page still goes
+    through 'resilient_request', so the retry/backoff policy applies per page.
+    With concurrency=1 (or no page count upstream) we fall back to following
+    the 'info.next' links one by one.
+    """
+    if concurrency is None:
+        concurrency = constants.SYNC_CONCURRENCY
+
+    first_page = resilient_request(constants.EXTERNAL_API_URL)
+    yield first_page
+
+    total_pages = first_page['info'].get('pages')
+    if concurrency > 1 and total_pages:
+        page_urls = [
+            f"{constants.EXTERNAL_API_URL}?page={page}"
+            for page in range(2, total_pages + 1)
+        ]
+        pool = ThreadPoolExecutor(max_workers=concurrency)
+        pending_urls = iter(page_urls)
+        # At most 'concurrency' fetches in flight: the next page is only
+        # submitted once the consumer took one, so backpressure from the
+        # pipeline reaches the network. Yielding in submission order keeps
+        # the merge order deterministic.
+        in_flight = deque(
+            pool.submit(resilient_request, url)
+            for url in islice(pending_urls, concurrency)
+        )
+        try:
+            while in_flight:
+                page = in_flight.popleft().result()
+                for url in islice(pending_urls, 1):
+                    in_flight.append(pool.submit(resilient_request, url))
+                yield page
+        finally:
+            # On abort, drop queued pages instead of waiting for them
+            # (and their retries); running fetches finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+        return
+
+    next_url = first_page['info'].get('next')
     while next_url:
         data = resilient_request(next_url)
-        # Define Earth variants as per the task
-        earth_origins = ["Earth (C-137)", "Earth (Replacement Dimension)"]
-
-        for char_data in data.get('results', []):
-            # Check for "Earth" in origin name
-            is_earth = (char_data['origin']['name'].startswith('Earth') or
-                        char_data['origin']['name'] in earth_origins)
-
-            # Persist only if all filters match
-            if (char_data['species'] == constants.EXTERNAL_FILTERS['species'] and
-                char_data['status'] == constants.EXTERNAL_FILTERS['status'] and
-                is_earth):
-
-                # Use "Upsert" logic (Update or Insert)
-                # FIX: Wrapped line to satisfy E501
-                existing_char = db.query(Character).filter(
-                    Character.id == char_data['id']
-                ).first()
-
-                if existing_char:
-                    # Update
-                    existing_char.name = char_data['name']
-                    existing_char.status = char_data['status']
-                    existing_char.origin_name = char_data['origin']['name']
-                    existing_char.is_earth_origin = is_earth
+        yield data
+        next_url = data['info'].get('next') # Handle pagination
+
+
+def fetch_stage(pages_out: pipeline.Channel, concurrency: int | None):
+    """Stage 1: pulls upstream pages (network-bound) into the page queue."""
+    # closing(): an aborted pipeline stops the page fetchers right away
+    with closing(fetch_character_pages(concurrency)) as fetched:
+        for page in pipeline.timed_iter("fetch", fetched):
+            metrics_setup.SYNC_STAGE_ITEMS.labels(stage="fetch", unit="pages").inc()
+            pages_out.put(page, stage="fetch")
+
+
+def transform_stage(
+    batches_out: pipeline.Channel,
+    pages_in: pipeline.Channel,
+    stored: dict,
+    seen_ids: set,
+    counts: dict,
+    incremental: bool,
+    job: sync_jobs.SyncJob | None,
+):
+    """
+    Stage 2: filters each page, fingerprints the rows and classifies them
+    against 'stored'; rows to write leave in batches of UPSERT_BATCH_SIZE.
+    Owns 'stored', 'seen_ids' and 'counts' until the pipeline has finished.
+    """
+    # Define Earth variants as per the task
+    earth_origins = ["Earth (C-137)", "Earth (Replacement Dimension)"]
+
+    pending_rows = []
+    for data in pages_in:
+        with pipeline.timed("transform"):
+            for char_data in data.get('results', []):
+                # Check for "Earth" in origin name
+                is_earth = (char_data['origin']['name'].startswith('Earth') or
+                            char_data['origin']['name'] in earth_origins)
+
+                # Persist only if all filters match
+                if not (
+                    char_data['species'] == constants.EXTERNAL_FILTERS['species']
+                    and char_data['status'] == constants.EXTERNAL_FILTERS['status']
+                    and is_earth
+                ):
+                    continue
+
+                row = {
+                    "id": char_data['id'],
+                    "name": char_data['name'],
+                    "species": char_data['species'],
+                    "status": char_data['status'],
+                    "origin_name": char_data['origin']['name'],
+                    "is_earth_origin": is_earth,
+                }
+                row["content_hash"] = database.character_fingerprint(row)
+                row["is_deleted"] = False
+                counts["processed"] += 1
+                seen_ids.add(row["id"])
+
+                # Delta detection against the stored fingerprint
+                previous = stored.get(row["id"])
+                if previous is None or previous[1]:
+                    outcome = "inserted"
+                elif previous[0] != row["content_hash"]:
+                    outcome = "updated"
                 else:
-                    # Insert
-                    new_char = Character(
-                        id=char_data['id'],
-                        name=char_data['name'],
-                        species=char_data['species'],
-                        status=char_data['status'],
-                        origin_name=char_data['origin']['name'],
-                        is_earth_origin=is_earth
+                    outcome = "unchanged"
+                counts[outcome] += 1
+                stored[row["id"]] = (row["content_hash"], False)
+
+                if outcome != "unchanged" or not incremental:
+                    pending_rows.append(row)
+
+        metrics_setup.SYNC_STAGE_ITEMS.labels(stage="transform", unit="pages").inc()
+        metrics_setup.SYNC_STAGE_ITEMS.labels(stage="transform", unit="rows").inc(
+            len(data.get('results', []))
+        )
+        if job:
+            job.record_page()
+
+        # Hand full batches to the writer as we go
+        if len(pending_rows) >= constants.UPSERT_BATCH_SIZE:
+            batches_out.put(pending_rows, stage="transform")
+            pending_rows = []
+
+    if pending_rows:
+        batches_out.put(pending_rows, stage="transform")
+
+
+def ingest_all_characters(
+    db: Session,
+    concurrency: int | None = None,
+    incremental: bool | None = None,
+    tombstone_missing: bool | None = None,
+    job: sync_jobs.SyncJob | None = None,
+) -> dict:
+    """
+    Collects all pages of filtered data from the external API and persists them.
+
+    Runs as a staged pipeline: fetch -> transform -> batched write, each
+    stage on its own thread and connected by bounded queues (SYNC_QUEUE_SIZE),
+    so network and DB I/O overlap and a slow stage throttles the ones before
+    it. The writer runs on the calling thread, which owns the DB session.
+
+    Existing fingerprints are loaded once up front; in incremental mode only
+    new or changed rows are written. Returns per-outcome counts. If a job is
+    given, page and row progress is reported on it.
+    """
+    if incremental is None:
+        incremental = constants.SYNC_INCREMENTAL
+    if tombstone_missing is None:
+        tombstone_missing = constants.SYNC_TOMBSTONE_MISSING
+
+    # Per-phase wall time; the fetch/transform stages, which overlap with
+    # the writes, are timed separately by the stage metrics
+    timer = profiling.PhaseTimer()
+    with timer.phase("load_fingerprints"):
+        stored = database.load_fingerprints(db)
+        db.commit() # Release the connection while we wait on the network
+    seen_ids = set()
+    counts = {"processed": 0, "inserted": 0, "updated": 0, "unchanged": 0,
+              "deleted": 0}
+
+    # Batches commit as they arrive, each bumping the shared dataset version
+    # in its transaction, so a sync failing halfway may still have changed
+    # the data
+    changed = False
+    try:
+        with timer.phase("pipeline"), \
+                pipeline.Pipeline(constants.SYNC_QUEUE_SIZE) as stages:
+            pages = stages.channel("pages")
+            batches = stages.channel("batches")
+            stages.spawn("fetch", fetch_stage, pages, concurrency)
+            stages.spawn(
+                "transform", transform_stage, batches,
+                pages, stored, seen_ids, counts, incremental, job,
+            )
+
+            # Stage 3: set-based "Upsert", one commit per batch
+            for batch in batches:
+                with pipeline.timed("write"), timer.phase("write"):
+                    written = database.bulk_upsert_characters(
+                        db, batch, before_commit=coordination.bump_dataset_version
                     )
-                    db.add(new_char)
+                metrics_setup.SYNC_STAGE_ITEMS.labels(stage="write", unit="rows").inc(
+                    written
+                )
+                if job:
+                    job.record_rows(written)
+                changed = changed or written > 0
+
+        if tombstone_missing:
+            with timer.phase("tombstone"):
+                missing_ids = [
+                    char_id for char_id, (_, is_deleted) in stored.items()
+                    if char_id not in seen_ids and not is_deleted
+                ]
+                counts["deleted"] = database.tombstone_characters(
+                    db, missing_ids, before_commit=coordination.bump_dataset_version
+                )
+                changed = changed or counts["deleted"] > 0
+            if job:
+                job.record_rows(counts["deleted"])
+    finally:
+        # New dataset version -> cached API responses (and ETags) are stale
+        # on every replica; also after a partial sync that committed rows
+        if changed:
+            with timer.phase("publish"):
+                coordination.adopt_published_version()
+
+    timer.observe(metrics_setup.SYNC_PHASE_LATENCY)
+    if job:
+        job.phases_ms = timer.milliseconds()
+
+    # SRE Observability: Update the business metrics
+    metrics_setup.PROCESSED_CHARACTERS.set(counts["processed"])
+    for outcome in ("inserted", "updated", "unchanged", "deleted"):
+        metrics_setup.SYNC_ROWS_TOTAL.labels(outcome=outcome).inc(counts[outcome])
+    return counts
 
-                db.commit() # Commit per character (or batch)
-                processed_count += 1
 
-        next_url = data['info'].get('next') # Handle pagination
+# --- 6. MAIN API ENDPOINT (/characters) ---
+SORT_VARIANTS = (None, "name", "id")
 
-    # SRE Observability: Update the business metric
-    metrics_setup.PROCESSED_CHARACTERS.set(processed_count)
-    return processed_count
+
+def characters_query():
+    """Base SELECT for the public character listing (usable sync or async)."""
+    # Query the DB using the pre-filtered, SRE-efficient flag
+    return select(*database.PUBLIC_COLUMNS).where(
+        Character.species == constants.EXTERNAL_FILTERS['species'],
+        Character.status == constants.EXTERNAL_FILTERS['status'],
+        # 'IS true' instead of a bare flag so the listing indexes can match it
+        Character.is_earth_origin.is_(True),
+        Character.is_deleted.is_(False)
+    )
+
+
+def encode_json(payload) -> bytes:
+    # orjson emits the same compact UTF-8 JSON as FastAPI's JSONResponse,
+    # several times faster than json.dumps
+    return orjson.dumps(payload)
+
+
+def rows_as_dicts(result) -> list[dict]:
+    """Plain row tuples -> dicts keyed by column name (no ORM hydration)."""
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result.all()]
+
+
+async def render_characters(db: AsyncSession, sort_by: str | None) -> bytes:
+    """Queries the filtered character list and encodes it as a JSON body."""
+    query = characters_query()
+
+    # Apply sorting. Unsorted listings use id order too: without an ORDER BY
+    # the row order would depend on whichever index the planner picks.
+    if sort_by == 'name':
+        query = query.order_by(Character.name, Character.id)
+    else:
+        query = query.order_by(Character.id)
+
+    with profiling.phase("db"):
+        result = await db.execute(query)
+    with profiling.phase("hydrate"):
+        rows = rows_as_dicts(result)
+    with profiling.phase("encode"):
+        return encode_json(rows)
+
+
+def encode_cursor(sort_by: str | None, row: dict) -> str:
+    """Opaque cursor holding the sort key of the last row on a page."""
+    key = [row["name"], row["id"]] if sort_by == "name" else [row["id"]]
+    raw = json.dumps({"sort_by": sort_by, "key": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, sort_by: str | None) -> list:
+    """Returns the seek key, or raises 400 for foreign/garbled cursors."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        key = payload["key"]
+        # The seek key is bound into typed comparisons; wrong types would
+        # fail on Postgres and silently match nothing on SQLite
+        types = (str, int) if sort_by == "name" else (int,)
+        valid = (
+            payload["sort_by"] == sort_by
+            and isinstance(key, list)
+            and len(key) == len(types)
+            and all(
+                isinstance(value, kind) and not isinstance(value, bool)
+                for value, kind in zip(key, types)
+            )
+        )
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor parameter.")
+    return key
+
+
+async def render_characters_page(
+    db: AsyncSession, sort_by: str | None, limit: int, cursor: str | None
+) -> bytes:
+    """
+    Keyset (seek) pagination: each page starts right after the previous
+    page's last sort key, so every page costs the same regardless of depth.
+    Unsorted pages use id order.
+    """
+    query = characters_query()
+
+    if sort_by == "name":
+        if cursor:
+            name, char_id = decode_cursor(cursor, sort_by)
+            query = query.where(
+                tuple_(Character.name, Character.id) > tuple_(name, char_id)
+            )
+        query = query.order_by(Character.name, Character.id)
+    else:
+        if cursor:
+            (char_id,) = decode_cursor(cursor, sort_by)
+            query = query.where(Character.id > char_id)
+        query = query.order_by(Character.id)
+
+    # Fetch one extra row to know whether another page exists
+    with profiling.phase("db"):
+        result = await db.execute(query.limit(limit + 1))
+    with profiling.phase("hydrate"):
+        rows = rows_as_dicts(result)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort_by, rows[-1])
+    with profiling.phase("encode"):
+        return encode_json({"results": rows, "next_cursor": next_cursor})
+
+
+def timed(timer: profiling.PhaseTimer, headers: dict) -> dict:
+    """Records the listing's phase timings and adds the Server-Timing header."""
+    timer.observe(metrics_setup.REQUEST_PHASE_LATENCY, endpoint="/api/v1/characters")
+    headers["Server-Timing"] = timer.server_timing()
+    return headers
+
+
+async def cached_listing(
+    db: AsyncSession, sort_by: str | None, encoding: str | None
+) -> tuple[bytes, str | None, int | None]:
+    """
+    The full listing as (body, applied encoding, dataset version of the
+    body). The identity body and each requested coding are cached
+    separately, so each is rendered / compressed once per version; a
+    coding whose body stays uncompressed (under COMPRESSION_MIN_SIZE) is
+    cached as (identity body, None). A cache miss is rendered at the
+    version read along with the rows.
+    """
+    version = cache.current_version()
+    if encoding is not None:
+        with profiling.phase("cache"):
+            entry = cache.response_cache.get((version, sort_by, encoding))
+        if entry is not None:
+            body, applied = entry
+            return body, applied, version
+
+    with profiling.phase("cache"):
+        body = cache.response_cache.get((version, sort_by))
+    if body is None:
+        require_db()
+        version, body = await coordination.versioned_read(
+            db, lambda: render_characters(db, sort_by)
+        )
+        if version is not None:
+            cache.adopt_newer_version(version)
+            cache.response_cache.put((version, sort_by), body)
+
+    compressed, applied = compression.encode(body, encoding)
+    if encoding is not None and version is not None:
+        cache.response_cache.put((version, sort_by, encoding), (compressed, applied))
+    return compressed, applied, version
+
+
+async def warm_characters_cache():
+    """
+    Pre-renders every sort_by variant and builds the search index for the
+    current dataset version.
+    """
+    async with database.AsyncSessionLocal() as db:
+        for sort_by in SORT_VARIANTS:
+            version, body = await coordination.versioned_read(
+                db, lambda: render_characters(db, sort_by)
+            )
+            if version is not None:
+                cache.adopt_newer_version(version)
+                cache.response_cache.put((version, sort_by), body)
+    await refresh_search_index()
 
 
-# --- 6. MAIN API ENDPOINT (/characters) ---
 @app.get("/api/v1/characters")
 @limiter.limit("20/minute")  # <-- NEW: Rate limit
 async def get_characters(
     request: Request,  # <-- NEW: 'request' is required for the limiter
     sort_by: str = Query(None, description="Sort by 'name' or 'id'"),
-    db: Session = Depends(database.get_db)
+    limit: int = Query(
+        None, ge=1, le=constants.PAGE_SIZE_MAX,
+        description="Page size; enables paginated responses"
+    ),
+    cursor: str = Query(None, description="'next_cursor' from the previous page"),
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    """Serves the filtered list of characters from our local DB."""
+    """
+    Serves the filtered list of characters from our local DB.
+    Without 'limit'/'cursor' the full list is returned (as before); bodies
+    are cached per sort_by variant until the next sync, so a cache hit never
+    touches the DB (the session only connects on first query). With them, a
+    {"results": [...], "next_cursor": ...} page is returned.
+    Every response carries an ETag; a matching If-None-Match gets a 304.
+    Bodies are gzip/brotli compressed per Accept-Encoding; full listings
+    are compressed once per version and served from the cache.
+    Phase timings (cache, db, hydrate, encode, compress) are exported as
+    histograms and in a Server-Timing header.
+    """
+    timer = profiling.start_request_timer()
 
     # 400 Error Handling for invalid parameters
+    # (counted in http_errors_total by the metrics middleware)
     if sort_by and sort_by not in ["name", "id"]:
-        metrics_setup.HTTP_ERRORS_TOTAL.labels(
-            method="GET",
-            endpoint="/api/v1/characters",
-            status_code=400
-        ).inc()
         detail_msg = "Invalid sort_by parameter. Use 'name' or 'id'."
         raise HTTPException(status_code=400, detail=detail_msg)
 
-    # Query the DB using the pre-filtered, SRE-efficient flag
-    query = db.query(Character).filter(
-        Character.species == constants.EXTERNAL_FILTERS['species'],
-        Character.status == constants.EXTERNAL_FILTERS['status'],
-        # FIX: Replaced '== True' with implicit check (E712)
-        Character.is_earth_origin
+    # Each content coding is its own representation with its own ETag
+    encoding = compression.negotiate(request.headers.get("accept-encoding"))
+
+    # Conditional GET, decided from the dataset version before rendering.
+    # ETags always name the version a body was read at: full listings are
+    # checked against the cached version (no DB query), pages against the
+    # published one.
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    paginated = limit is not None or cursor is not None
+    if paginated:
+        require_db()
+        version = await coordination.read_dataset_version(db)
+    else:
+        version = cache.current_version()
+    etag = cache.etag_for(version, sort_by, limit, cursor, encoding)
+    if etag is not None and cache.etag_matches(if_none_match, etag):
+        headers["ETag"] = etag
+        return Response(status_code=304, headers=timed(timer, headers))
+
+    if paginated:
+        version, body = await coordination.versioned_read(
+            db, lambda: render_characters_page(
+                db, sort_by, limit or constants.PAGE_SIZE_DEFAULT, cursor
+            )
+        )
+        body, applied = compression.encode(body, encoding)
+    else:
+        body, applied, version = await cached_listing(db, sort_by, encoding)
+
+    etag = cache.etag_for(version, sort_by, limit, cursor, encoding)
+    if etag is not None:
+        headers["ETag"] = etag
+    if applied is not None:
+        headers["Content-Encoding"] = applied
+    compression.record(body, applied)
+    return Response(
+        content=body, media_type="application/json", headers=timed(timer, headers)
     )
 
-    # Apply sorting
-    if sort_by == 'name':
-        query = query.order_by(Character.name)
-    elif sort_by == 'id':
-        query = query.order_by(Character.id)
 
-    characters = query.all()
-    return characters
+# --- 6.1. STREAMING EXPORT ENDPOINT ---
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def stream_characters(export_format: str):
+    """
+    Yields the filtered listing as NDJSON or CSV, one chunk per partition.
+    Rows are read through a server-side cursor (yield_per), so memory stays
+    flat whatever the table size. Runs in the threadpool with its own
+    session, which lives exactly as long as the stream.
+    """
+    db = database.SessionLocal()
+    try:
+        statement = characters_query().order_by(Character.id)
+        result = db.execute(
+            statement,
+            execution_options={"yield_per": constants.EXPORT_CHUNK_SIZE},
+        ).mappings()
+        columns = [column.key for column in database.PUBLIC_COLUMNS]
+
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=columns)
+            writer.writeheader()
+            for partition in result.partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            for partition in result.partitions():
+                yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in partition)
+    finally:
+        db.close()
+
+
+@app.get("/api/v1/characters/export")
+@limiter.limit("5/minute")
+async def export_characters(
+    request: Request,  # 'request' is required for the limiter
+    export_format: str = Query(
+        "ndjson", alias="format", description="Export format: 'ndjson' or 'csv'"
+    ),
+):
+    """Streams every filtered character for downstream batch jobs."""
+    if export_format not in EXPORT_MEDIA_TYPES:
+        detail_msg = "Invalid format parameter. Use 'ndjson' or 'csv'."
+        raise HTTPException(status_code=400, detail=detail_msg)
+
+    require_db()
+    filename = f"characters.{export_format}"
+    return StreamingResponse(
+        stream_characters(export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# --- 6.2. SEARCH ENDPOINT ---
+# One index build at a time per process (sync worker thread or threadpool)
+_search_build_lock = threading.Lock()
 
 
-# --- 7. DATA SYNC ENDPOINT ---
-@app.post("/sync")
+def build_search_index(db: Session) -> search.CharacterIndex:
+    """
+    Rebuilds the search index from the listing query unless it already
+    matches the current dataset version. Blocking: call it off the loop.
+    """
+    with _search_build_lock:
+        if search.index.version == cache.current_version():
+            return search.index
+        version, rows = coordination.versioned_read_sync(
+            db, lambda: rows_as_dicts(
+                db.execute(characters_query().order_by(Character.id))
+            )
+        )
+        if version is not None:
+            cache.adopt_newer_version(version)
+        return search.rebuild(rows, version)
+
+
+def _build_search_index_in_session() -> search.CharacterIndex:
+    db = database.SessionLocal()
+    try:
+        return build_search_index(db)
+    finally:
+        db.close()
+
+
+async def refresh_search_index() -> search.CharacterIndex:
+    """
+    Returns the search index for the current dataset version. Syncs and the
+    health monitor rebuild it as soon as a new version appears; a request
+    that still finds it stale waits for a single shared rebuild.
+    """
+    if search.index.version == cache.current_version():
+        return search.index
+    async with app.state.search_index_lock:
+        # Another request may have rebuilt it while we waited
+        if search.index.version == cache.current_version():
+            return search.index
+        return await run_in_threadpool(_build_search_index_in_session)
+
+
+@app.get("/api/v1/characters/search")
+@limiter.limit("120/minute") # Type-ahead: one call per keystroke
+async def search_characters(
+    request: Request,  # 'request' is required for the limiter
+    q: str = Query(..., min_length=1, max_length=100, description="Name query"),
+    limit: int = Query(
+        constants.SEARCH_LIMIT_DEFAULT, ge=1, le=constants.SEARCH_LIMIT_MAX,
+        description="Maximum number of results"
+    ),
+):
+    """
+    Ranked name search over the filtered listing: exact match, then name
+    prefix, word prefix and substring (3+ characters). Served from an
+    in-memory index rebuilt once per dataset version (after each sync, off
+    the request path), never from LIKE scans.
+    """
+    index = search.index
+    if index.version != cache.current_version():
+        require_db()
+        index = await refresh_search_index()
+
+    # The index's own version: the one its rows were read at
+    headers = {"Cache-Control": "no-cache"}
+    etag = cache.etag_for(index.version, "search", q, limit)
+    if etag is not None:
+        headers["ETag"] = etag
+        if cache.etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+    body = encode_json({"query": q, "results": index.search(q, limit)})
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# --- 7. DATA SYNC ENDPOINTS (Background Jobs) ---
+def run_sync_job(job: sync_jobs.SyncJob) -> dict:
+    """
+    Runs one ingestion on the job worker thread with its own DB session,
+    under the cross-replica sync lock. Skipped if another replica holds it,
+    and scheduled runs are skipped if any process synced recently enough.
+    Profiled jobs cover this thread: orchestration and the batched writes.
+    """
+    if job.skip_if_synced_within is not None:
+        last = coordination.last_successful_sync()
+        if last is not None and time.time() - last < job.skip_if_synced_within:
+            raise sync_jobs.JobSkipped(
+                f"Already synced {time.time() - last:.0f}s ago"
+            )
+    capture = profiling.capture(f"sync {job.id}") if job.profile else nullcontext()
+    with capture as profile_id, coordination.sync_lock() as acquired:
+        job.profile_id = profile_id
+        if not acquired:
+            raise sync_jobs.JobSkipped("Sync already running on another replica")
+        db = database.SessionLocal()
+        try:
+            counts = ingest_all_characters(db, job=job)
+            coordination.record_successful_sync()
+            return counts
+        finally:
+            # A published version (even after a partial sync) gets its
+            # search index now, not on the next search
+            try:
+                db.rollback()
+                build_search_index(db)
+            except Exception as e:
+                print(f"Search index rebuild failed: {e}") # Retried on demand
+            db.close()
+
+
+# One sync at a time per process (duplicate triggers join the running job),
+# and one per cluster through the sync lock. Statuses are shared through the
+# DB, so any worker or replica can report any job.
+sync_job_manager = sync_jobs.SyncJobManager(
+    run_sync_job, replica=coordination.REPLICA_ID
+)
+
+# Optional periodic trigger (SYNC_SCHEDULE_INTERVAL > 0), started in lifespan
+sync_scheduler = scheduler.SyncScheduler(
+    sync_job_manager,
+    constants.SYNC_SCHEDULE_INTERVAL,
+    constants.SYNC_SCHEDULE_JITTER,
+    constants.SYNC_SCHEDULE_MAX_INTERVAL,
+)
+
+
+@app.post("/sync", status_code=202)
 @limiter.limit("5/minute")  # <-- NEW: Stricter rate limit
 async def sync_data(
     request: Request,  # <-- NEW: 'request' is required for the limiter
-    db: Session = Depends(database.get_db)
 ):
-    """Triggers a manual data synchronization from the external API."""
-    characters_count = ingest_all_characters(db)
-    # FIX: Wrapped line to satisfy E501
-    return {
-        "message": f"Data synced successfully: {characters_count} characters processed"
-    }
+    """
+    Triggers a data synchronization from the external API in the background.
+    Returns the job id immediately; poll GET /sync/{job_id} for progress.
+    If another replica is already syncing, its status is returned instead.
+    With profiling enabled, an X-Profile header profiles the job; its
+    'profile_id' appears in the job status once it runs.
+    """
+    holder = await coordination.sync_lock_holder()
+    if holder is not None and holder != coordination.REPLICA_ID:
+        return {
+            "message": "Sync already running on another replica",
+            "status": sync_jobs.RUNNING,
+            "holder": holder,
+        }
+
+    profile = profiling.requested(request.headers.get(profiling.PROFILE_HEADER))
+    job, created = sync_job_manager.submit(profile=profile)
+    if created:
+        await sync_job_manager.register(job)
+    message = "Sync started" if created else "Sync already running"
+    return {"message": message, **job.to_dict()}
+
+
+@app.get("/sync/{job_id}")
+async def get_sync_status(job_id: str):
+    """
+    Reports progress (pages done, rows written, elapsed time) of a sync job.
+    Jobs of other workers/replicas are read from the shared job table.
+    """
+    job = sync_job_manager.get(job_id)
+    if job is not None:
+        return job.to_dict()
+    require_db()
+    status = await sync_jobs.load_job(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return status
 
 
 # --- 8. STARTUP EVENT (REMOVED) ---
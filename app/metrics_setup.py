@@ -1,9 +1,18 @@
 # File: app/metrics_setup.py
 
+import os
 import time
 
-from prometheus_client import REGISTRY, Counter, Gauge, Histogram, generate_latest
-from starlette.requests import Request
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
 from starlette.responses import Response
 
 # --- 1. SRE METRICS DEFINITION ---
@@ -18,46 +27,303 @@ HTTP_ERRORS_TOTAL = Counter(
     'Total number of API errors (4xx, 5xx)',
     ['method', 'endpoint', 'status_code']
 )
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes',
+    'Response body size',
+    ['method', 'endpoint'],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress',
+    'Requests currently being served',
+    ['method'],
+    multiprocess_mode='livesum'
+)
 PROCESSED_CHARACTERS = Gauge(
     'app_processed_characters_count',
-    'Total number of characters stored in the local DB'
+    'Total number of characters stored in the local DB',
+    # Only the worker that ran the latest sync sets it
+    multiprocess_mode='mostrecent'
+)
+SYNC_ROWS_TOTAL = Counter(
+    'app_sync_rows_total',
+    'Characters seen by sync, by outcome (inserted/updated/unchanged/deleted)',
+    ['outcome']
+)
+RESPONSE_CACHE_HITS = Counter(
+    'app_response_cache_hits_total',
+    'Character listings served from the in-memory response cache'
+)
+RESPONSE_CACHE_MISSES = Counter(
+    'app_response_cache_misses_total',
+    'Character listings that had to be rendered from the DB'
+)
+RESPONSE_CACHE_EVICTIONS = Counter(
+    'app_response_cache_evictions_total',
+    'Entries dropped from the response cache (size limit or new dataset version)'
+)
+
+
+# --- 1.1. DB CONNECTION POOL METRICS ---
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    'Connections currently checked out of the pool',
+    ['pool'],
+    multiprocess_mode='livesum'
+)
+DB_POOL_OVERFLOW = Gauge(
+    'db_pool_overflow_connections',
+    'Connections open beyond pool_size (negative while the pool is filling)',
+    ['pool'],
+    multiprocess_mode='livesum'
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting for a pooled connection (includes new connects)',
+    ['pool'],
+    buckets=(.0005, .001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+)
+DB_POOL_CONNECTIONS_CREATED = Counter(
+    'db_pool_connections_created_total',
+    'New DBAPI connections opened by the pool',
+    ['pool']
+)
+DB_POOL_INVALIDATIONS = Counter(
+    'db_pool_invalidations_total',
+    'Pooled connections invalidated (errors, failed pre-ping, recycle)',
+    ['pool']
+)
+
+# --- 1.2. HEALTH MONITOR METRICS ---
+DB_HEALTH_PROBE_LATENCY = Histogram(
+    'db_health_probe_duration_seconds',
+    'Latency of background DB health probes',
+    ['result']
+)
+DB_CIRCUIT_BREAKER_STATE = Gauge(
+    'db_circuit_breaker_state',
+    'DB circuit breaker state (0=closed, 1=half-open, 2=open)',
+    # Report the worst state across live workers
+    multiprocess_mode='livemax'
+)
+
+# --- 1.3. UPSTREAM API METRICS ---
+UPSTREAM_FETCH_LATENCY = Histogram(
+    'upstream_fetch_duration_seconds',
+    'Latency of one upstream page fetch (HTTP round-trip + parsing)',
+    ['result'],
+    buckets=(.025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+UPSTREAM_CACHE_REQUESTS = Counter(
+    'upstream_cache_requests_total',
+    'Upstream page fetches by cache result (hit = 304 revalidated, miss)',
+    ['result']
 )
 
+# --- 1.4. SYNC SCHEDULER METRICS ---
+SYNC_SCHEDULE_LAST_RUN = Gauge(
+    'app_sync_schedule_last_run_timestamp_seconds',
+    'Unix time at which the last scheduled sync finished',
+    multiprocess_mode='max'
+)
+SYNC_SCHEDULE_LAST_DURATION = Gauge(
+    'app_sync_schedule_last_duration_seconds',
+    'Wall time of the last scheduled sync',
+    multiprocess_mode='mostrecent'
+)
+SYNC_SCHEDULE_NEXT_RUN = Gauge(
+    'app_sync_schedule_next_run_timestamp_seconds',
+    'Unix time of the next scheduled sync',
+    # The soonest upcoming run across live workers
+    multiprocess_mode='livemin'
+)
+
+# --- 1.5. INGESTION PIPELINE METRICS ---
+SYNC_STAGE_LATENCY = Histogram(
+    'app_sync_stage_duration_seconds',
+    'Busy time per item of each ingestion stage (fetch/transform: per page, '
+    'write: per batch)',
+    ['stage'],
+    buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+SYNC_STAGE_ITEMS = Counter(
+    'app_sync_stage_items_total',
+    'Items handled by each ingestion stage (rate() gives pages/s and rows/s)',
+    ['stage', 'unit']
+)
+SYNC_STAGE_BLOCKED = Counter(
+    'app_sync_stage_blocked_seconds_total',
+    'Time a stage spent waiting on a full downstream queue (backpressure)',
+    ['stage']
+)
+SYNC_QUEUE_DEPTH = Gauge(
+    'app_sync_queue_depth',
+    'Items waiting in an ingestion pipeline queue',
+    ['queue'],
+    multiprocess_mode='livesum'
+)
+
+# --- 1.6. PER-PHASE TIMERS ---
+PHASE_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5,
+                 5, 10, 30, 60)
+REQUEST_PHASE_LATENCY = Histogram(
+    'app_request_phase_duration_seconds',
+    'Time spent per phase of a request (cache, db, hydrate, encode)',
+    ['endpoint', 'phase'],
+    buckets=PHASE_BUCKETS
+)
+SYNC_PHASE_LATENCY = Histogram(
+    'app_sync_phase_duration_seconds',
+    'Time spent per phase of a sync (load_fingerprints, pipeline, tombstone, '
+    'publish)',
+    ['phase'],
+    buckets=PHASE_BUCKETS
+)
+
+# --- 1.7. RESPONSE COMPRESSION METRICS ---
+# Observed once per compression, i.e. once per cached listing variant
+COMPRESSION_RATIO = Histogram(
+    'app_response_compression_ratio',
+    'Compressed size divided by original size',
+    ['encoding'],
+    buckets=(.05, .1, .15, .2, .25, .3, .4, .5, .6, .8, 1)
+)
+# Counted per response served, compressed or not
+RESPONSE_BODY_BYTES = Counter(
+    'app_response_body_bytes_total',
+    'Listing response body bytes sent, by content coding',
+    ['encoding']
+)
+
+
+# --- 1.8. RATE LIMITER METRICS ---
+RATE_LIMIT_DECISION_LATENCY = Histogram(
+    'app_rate_limit_decision_seconds',
+    'Time taken to decide whether a request is within its rate limits',
+    ['outcome'],
+    buckets=(.00005, .0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1)
+)
+RATE_LIMIT_LEASE_CLAIMS = Counter(
+    'app_rate_limit_lease_claims_total',
+    'Blocks of hits claimed from the shared rate-limit counters in the '
+    'background (round-trips), by result (ok/error)',
+    ['result']
+)
+
+def instrument_engine(engine, pool_name: str):
+    """Hooks pool events of a (sync) Engine into the pool metrics above."""
+
+    def update_overflow():
+        if hasattr(engine.pool, "overflow"):
+            DB_POOL_OVERFLOW.labels(pool=pool_name).set(engine.pool.overflow())
+
+    def on_checkout(*_):
+        DB_POOL_CHECKED_OUT.labels(pool=pool_name).inc()
+        update_overflow()
+
+    def on_checkin(*_):
+        # Fires before the pool takes the connection back, so track the
+        # count ourselves instead of reading pool.checkedout()
+        DB_POOL_CHECKED_OUT.labels(pool=pool_name).dec()
+        update_overflow()
+
+    def on_connect(*_):
+        DB_POOL_CONNECTIONS_CREATED.labels(pool=pool_name).inc()
+
+    def on_invalidate(*_):
+        DB_POOL_INVALIDATIONS.labels(pool=pool_name).inc()
+
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+    event.listen(engine, "invalidate", on_invalidate)
+    event.listen(engine, "soft_invalidate", on_invalidate)
+
+
 # --- 2. MIDDLEWARE FOR AUTOMATIC METRIC COLLECTION ---
-# (Middleware remains the same)
-async def metrics_middleware(request: Request, call_next):
-    start_time = time.time()
-    try:
-        response = await call_next(request)
-    except Exception as exc:
-        HTTP_ERRORS_TOTAL.labels(
-            method=request.method,
-            endpoint=request.url.path,
-            status_code=500
-        ).inc()
-        raise exc
-    process_time = time.time() - start_time
-    REQUEST_LATENCY.labels(
-        method=request.method,
-        endpoint=request.url.path
-    ).observe(process_time)
-    if response.status_code >= 400:
-         HTTP_ERRORS_TOTAL.labels(
-            method=request.method,
-            endpoint=request.url.path,
-            status_code=response.status_code
-        ).inc()
-    return response
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope) -> str:
+    """
+    Matched route template (e.g. '/sync/{job_id}'), set on the scope by the
+    router. Unmatched paths share one label to keep cardinality bounded.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware/call_next machinery).
+    Messages are passed straight through; only the status code and body
+    sizes are observed, so streaming responses are timed to the last byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        response_size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            # Unhandled exceptions keep status_code=500 and are re-raised
+            process_time = time.perf_counter() - start_time
+            in_progress.dec()
+            endpoint = route_template(scope)
+            REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(
+                process_time
+            )
+            RESPONSE_SIZE.labels(method=method, endpoint=endpoint).observe(
+                response_size
+            )
+            if status_code >= 400:
+                HTTP_ERRORS_TOTAL.labels(
+                    method=method, endpoint=endpoint, status_code=status_code
+                ).inc()
+
 
 # --- 3. EXPOSURE ---
+def scrape_registry():
+    """
+    Registry to expose on /metrics. With several workers per pod
+    (PROMETHEUS_MULTIPROC_DIR set), every worker writes its samples to
+    shared files and any worker answering a scrape aggregates all of them.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
 def setup_metrics(app):
     """Adds the /metrics endpoint and the middleware to the FastAPI app."""
-    app.middleware("http")(metrics_middleware)
+    app.add_middleware(MetricsMiddleware)
 
     @app.get("/metrics")
     def get_metrics():
         # CORRECT WAY: Use generate_latest to get the metrics data
         return Response(
-            content=generate_latest(REGISTRY), # Use generate_latest here
+            content=generate_latest(scrape_registry()), # Use generate_latest here
             media_type="text/plain"
         )
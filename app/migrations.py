@@ -0,0 +1,109 @@
+import time
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.schema import CreateColumn
+
+from app import database
+
+# --- 1. MIGRATION BOOKKEEPING ---
+# 'create_all' never alters existing tables, so schema changes for databases
+# that already exist in production are shipped as small, versioned steps.
+# Every step must be idempotent: a fresh database already has the full
+# schema from 'create_all', and the step only has to notice that.
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", Float, nullable=False),
+)
+
+# Arbitrary constant key for the Postgres advisory lock serializing
+# migrations across replicas that start at the same time
+MIGRATION_LOCK_KEY = 720_101
+
+
+# --- 2. MIGRATION STEPS ---
+def _add_missing_columns(conn, table, column_names):
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    for name in column_names:
+        if name in existing:
+            continue
+        column_ddl = CreateColumn(table.c[name]).compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+
+
+def add_fingerprint_columns(conn):
+    """content_hash / is_deleted columns used by incremental sync."""
+    _add_missing_columns(
+        conn, database.Character.__table__, ["content_hash", "is_deleted"]
+    )
+
+
+def add_listing_indexes(conn):
+    """Composite (covering on Postgres) indexes for the listing query."""
+    for index in database.Character.__table__.indexes:
+        if index.name.startswith("ix_characters_listing_"):
+            index.create(conn, checkfirst=True)
+
+
+def add_last_synced_at(conn):
+    """sync_state.last_synced_at, read by the sync schedulers of all replicas."""
+    table = database.SyncState.__table__
+    # Databases from before sync_state get the whole table from create_all
+    if inspect(conn).has_table(table.name):
+        _add_missing_columns(conn, table, ["last_synced_at"])
+
+
+MIGRATIONS = [
+    (1, "Add content_hash and is_deleted to characters", add_fingerprint_columns),
+    (2, "Add composite listing indexes on characters", add_listing_indexes),
+    (3, "Add last_synced_at to sync_state", add_last_synced_at),
+]
+
+
+# --- 3. RUNNER ---
+def run_migrations(engine=None) -> list[int]:
+    """
+    Applies pending migrations in version order, one transaction each.
+    Called from the application lifespan after init_db().
+    Returns the versions applied by this call.
+    """
+    engine = engine if engine is not None else database.engine
+    migration_metadata.create_all(bind=engine)
+
+    applied_now = []
+    for version, description, upgrade in MIGRATIONS:
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"),
+                    {"key": MIGRATION_LOCK_KEY},
+                )
+            already_applied = conn.execute(
+                select(schema_migrations.c.version).where(
+                    schema_migrations.c.version == version
+                )
+            ).first()
+            if already_applied:
+                continue
+
+            upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, description=description, applied_at=time.time()
+            ))
+        print(f"--- Applied migration {version}: {description} ---")
+        applied_now.append(version)
+    return applied_now
@@ -0,0 +1,144 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from app import metrics_setup
+
+# Marks the end of a channel's stream
+_DONE = object()
+# How often blocked stages re-check whether the pipeline was aborted
+_POLL_SECONDS = 0.1
+
+
+class PipelineAborted(Exception):
+    """Raised inside a stage when another stage failed; unwinds it quietly."""
+
+
+# --- 1. BOUNDED CHANNELS ---
+class Channel:
+    """
+    Bounded queue between two stages. put() blocks while it is full, which
+    is what throttles a fast producer to the speed of its consumer.
+    """
+
+    def __init__(self, name: str, maxsize: int, aborted: threading.Event):
+        self.name = name
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._aborted = aborted
+
+    def put(self, item, stage: str):
+        blocked_since = self._put(item)
+        if blocked_since is not None:
+            metrics_setup.SYNC_STAGE_BLOCKED.labels(stage=stage).inc(
+                time.perf_counter() - blocked_since
+            )
+        self._report_depth()
+
+    def close(self):
+        self._put(_DONE)
+
+    def _put(self, item) -> float | None:
+        """Blocks until there is room (or abort); returns when blocking began."""
+        blocked_since = None
+        while True:
+            if self._aborted.is_set():
+                raise PipelineAborted()
+            try:
+                self._queue.put(item, timeout=_POLL_SECONDS)
+                return blocked_since
+            except queue.Full:
+                blocked_since = blocked_since or time.perf_counter()
+
+    def __iter__(self):
+        while True:
+            if self._aborted.is_set():
+                raise PipelineAborted()
+            try:
+                item = self._queue.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            self._report_depth()
+            if item is _DONE:
+                return
+            yield item
+
+    def _report_depth(self):
+        metrics_setup.SYNC_QUEUE_DEPTH.labels(queue=self.name).set(
+            self._queue.qsize()
+        )
+
+
+# --- 2. STAGE THREADS ---
+class Pipeline:
+    """
+    Runs producer stages on their own threads, connected by Channels; the
+    last stage runs on the caller's thread inside the 'with' block. The
+    first stage failure aborts every stage and is re-raised on exit.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.aborted = threading.Event()
+        self._threads = []
+        self._errors = []
+
+    def channel(self, name: str) -> Channel:
+        return Channel(name, self.queue_size, self.aborted)
+
+    def spawn(self, name: str, stage, output: Channel, *args):
+        """Runs stage(output, *args) on a thread; closes output when it ends."""
+        thread = threading.Thread(
+            target=self._run_stage, args=(stage, output, args),
+            name=f"sync-{name}", daemon=True,
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _run_stage(self, stage, output: Channel, args):
+        try:
+            stage(output, *args)
+            output.close()
+        except PipelineAborted:
+            pass
+        except Exception as e:
+            self._errors.append(e)
+            self.aborted.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.aborted.set()
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            # The first failure is the root cause; later ones are fallout
+            raise self._errors[0]
+        return False
+
+
+@contextmanager
+def timed(stage: str):
+    """Observes the wrapped block as one item of busy time for 'stage'."""
+    start = time.perf_counter()
+    yield
+    metrics_setup.SYNC_STAGE_LATENCY.labels(stage=stage).observe(
+        time.perf_counter() - start
+    )
+
+
+def timed_iter(stage: str, iterable):
+    """Yields from iterable, timing each next() as busy time for 'stage'."""
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        metrics_setup.SYNC_STAGE_LATENCY.labels(stage=stage).observe(
+            time.perf_counter() - start
+        )
+        yield item
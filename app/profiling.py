@@ -0,0 +1,250 @@
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import HTTPException, Query
+from starlette.requests import Request
+from starlette.responses import FileResponse, PlainTextResponse
+
+from app import constants
+
+PROFILE_HEADER = "x-profile"
+# POST /sync only queues a job; its X-Profile header is handed to the job
+# (profiled on the worker thread) instead of profiling the request itself
+JOB_PROFILED_PATHS = {"/sync"}
+# Artifact downloads send the header for auth; they are never profiled
+ARTIFACT_PATH = "/debug/profiles"
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+# --- 1. PER-PHASE TIMERS (always on) ---
+class PhaseTimer:
+    """Accumulates wall time per named phase; a phase may be entered repeatedly."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = (
+                self.durations.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    def observe(self, histogram, **labels):
+        for name, seconds in self.durations.items():
+            histogram.labels(phase=name, **labels).observe(seconds)
+
+    def milliseconds(self) -> dict:
+        return {name: round(s * 1000, 3) for name, s in self.durations.items()}
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, including the total so far."""
+        total = time.perf_counter() - self.started
+        entries = [*self.durations.items(), ("total", total)]
+        return ", ".join(f"{name};dur={s * 1000:.2f}" for name, s in entries)
+
+
+# The timer of the request being handled (each request runs in its own context)
+_request_timer = ContextVar("request_timer", default=None)
+
+
+def start_request_timer() -> PhaseTimer:
+    timer = PhaseTimer()
+    _request_timer.set(timer)
+    return timer
+
+
+@contextmanager
+def phase(name: str):
+    """Times a block into the current request's timer (no-op outside one)."""
+    timer = _request_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.phase(name):
+        yield
+
+
+# --- 2. PROFILE CAPTURE (opt-in) ---
+# cProfile can only run once per process at a time
+_capture_lock = threading.Lock()
+
+
+def authorized(header_value: str | None) -> bool:
+    """Profiling is on and, if PROFILING_TOKEN is set, the header carries it."""
+    if not constants.PROFILING_ENABLED:
+        return False
+    if not constants.PROFILING_TOKEN:
+        return True
+    return header_value is not None and hmac.compare_digest(
+        header_value, constants.PROFILING_TOKEN
+    )
+
+
+def requested(header_value: str | None) -> bool:
+    return header_value is not None and authorized(header_value)
+
+
+def _artifact_path(profile_id: str, suffix: str) -> str:
+    return os.path.join(constants.PROFILING_DIR, f"{profile_id}.{suffix}")
+
+
+def _save(profile_id: str, label: str, profiler: cProfile.Profile, seconds: float):
+    os.makedirs(constants.PROFILING_DIR, exist_ok=True)
+    profiler.dump_stats(_artifact_path(profile_id, "prof"))
+    with open(_artifact_path(profile_id, "json"), "w") as f:
+        json.dump({
+            "profile_id": profile_id,
+            "label": label,
+            "created_at": time.time(),
+            "duration_ms": round(seconds * 1000, 3),
+        }, f)
+
+    # Keep only the most recent artifacts
+    for stale in list_profiles()[constants.PROFILING_MAX_ARTIFACTS:]:
+        for suffix in ("prof", "json"):
+            try:
+                os.remove(_artifact_path(stale["profile_id"], suffix))
+            except OSError:
+                pass
+
+
+@contextmanager
+def capture(label: str):
+    """
+    Runs cProfile around the block and stores the result as an artifact.
+    Yields the profile id, or None if another capture is already running.
+    cProfile sees only the current thread; on the event loop that includes
+    whatever else the loop runs meanwhile.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        yield None
+        return
+    try:
+        profile_id = uuid.uuid4().hex
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield profile_id
+        finally:
+            profiler.disable()
+            _save(profile_id, label, profiler, time.perf_counter() - start)
+    finally:
+        _capture_lock.release()
+
+
+def list_profiles() -> list[dict]:
+    """Stored artifacts, newest first."""
+    try:
+        names = os.listdir(constants.PROFILING_DIR)
+    except OSError:
+        return []
+    profiles = []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(constants.PROFILING_DIR, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+
+# --- 3. ASGI MIDDLEWARE ---
+class ProfilingMiddleware:
+    """
+    Profiles a request when it carries an authorized X-Profile header (or
+    is sampled at PROFILING_SAMPLE_RATE). The response gets an X-Profile-Id
+    header; the artifact is stored once the response body has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        with capture(f"{scope['method']} {scope['path']}") as profile_id:
+            if profile_id is None:
+                await self.app(scope, receive, send) # Another capture running
+                return
+
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    headers = [*message.get("headers", []),
+                               (b"x-profile-id", profile_id.encode())]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_id)
+
+    def _wanted(self, scope) -> bool:
+        path = scope["path"]
+        if not constants.PROFILING_ENABLED or path in JOB_PROFILED_PATHS:
+            return False
+        if path.startswith(ARTIFACT_PATH):
+            return False
+        header = dict(scope["headers"]).get(PROFILE_HEADER.encode())
+        if header is not None:
+            return requested(header.decode("latin-1"))
+        return random.random() < constants.PROFILING_SAMPLE_RATE
+
+
+# --- 4. ARTIFACT ENDPOINTS ---
+def require_profiling(request: Request):
+    if not authorized(request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+def setup_profiling(app):
+    """Adds the profiling middleware and the artifact download endpoints."""
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get(ARTIFACT_PATH)
+    async def get_profiles(request: Request):
+        """Lists stored profile artifacts, newest first."""
+        require_profiling(request)
+        return list_profiles()
+
+    @app.get(ARTIFACT_PATH + "/{profile_id}")
+    async def download_profile(
+        request: Request,
+        profile_id: str,
+        artifact_format: str = Query("prof", alias="format"),
+    ):
+        """
+        Downloads one artifact: 'prof' is the raw pstats dump (pstats,
+        snakeviz), 'text' the top functions by cumulative time.
+        """
+        require_profiling(request)
+        path = _artifact_path(profile_id, "prof")
+        if not _PROFILE_ID.match(profile_id) or not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="Profile not found")
+        if artifact_format == "text":
+            report = io.StringIO()
+            stats = pstats.Stats(path, stream=report)
+            stats.sort_stats("cumulative").print_stats(50)
+            return PlainTextResponse(report.getvalue())
+        return FileResponse(
+            path, media_type="application/octet-stream",
+            filename=f"profile-{profile_id}.prof",
+        )
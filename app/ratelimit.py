@@ -0,0 +1,438 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+from slowapi import Limiter
+from slowapi.errors import RateLimitExceeded
+from sqlalchemy import case, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.requests import Request
+
+from app import constants, database, metrics_setup
+from app.database import RateLimitCounter
+
+# Expired counter rows and leases are dropped at most this often (seconds)
+PURGE_INTERVAL = 60.0
+# Seconds to wait before claiming again after a failed claim
+CLAIM_RETRY_INTERVAL = 5.0
+
+# Set by TimedLimiter around slowapi's synchronous checks: a list that
+# collects the hits instead of deciding them (prepare pass), then the
+# request's reservations {key: [lease, amount]} (deciding pass)
+_recording: ContextVar[list | None] = ContextVar("rate_limit_recording", default=None)
+_reservations: ContextVar[dict | None] = ContextVar(
+    "rate_limit_reservations", default=None
+)
+
+
+# --- 1. SHARED COUNTERS (DATABASE) ---
+def _increment_statement(dialect: str, key: str, expiry: float, amount: int,
+                         now: float):
+    """
+    Upsert that atomically adds 'amount' to a counter row, restarting it if
+    its window has expired. Returns (hits, expires_at) after the update.
+    """
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    expired = RateLimitCounter.expires_at <= now
+    statement = insert(RateLimitCounter).values(
+        key=key, hits=amount, expires_at=now + expiry
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[RateLimitCounter.key],
+        set_={
+            "hits": case((expired, amount), else_=RateLimitCounter.hits + amount),
+            "expires_at": case(
+                (expired, now + expiry), else_=RateLimitCounter.expires_at
+            ),
+        },
+    ).returning(RateLimitCounter.hits, RateLimitCounter.expires_at)
+
+
+def _read_statement(key: str, now: float):
+    """(hits, expires_at) of a live counter row."""
+    return select(RateLimitCounter.hits, RateLimitCounter.expires_at).where(
+        RateLimitCounter.key == key, RateLimitCounter.expires_at > now
+    )
+
+
+# --- 2. LOCAL ALLOTMENTS ---
+@dataclass
+class _Lease:
+    """
+    This process's view of one sliding window of a key. 'ranges' are
+    claimed counter positions not handed out yet, of which 'reserved' are
+    promised to requests being prepared; 'seen' is the shared count at the
+    last claim and 'previous' the final count of the window before.
+    """
+    window: str
+    expires_at: float
+    block: int
+    previous: int = 0
+    seen: int = 0
+    claimed: bool = False
+    reserved: int = 0
+    local: int = 0 # Hits admitted per process while claims fail
+    claim: asyncio.Task | None = None
+    ranges: deque = field(default_factory=deque)
+
+    def available(self) -> int:
+        held = sum(last - first + 1 for first, last in self.ranges)
+        return held - self.reserved
+
+    def position(self, amount: int) -> int:
+        """The position the next 'amount' hits would end on."""
+        for first, last in self.ranges:
+            if amount <= last - first + 1:
+                return first + amount - 1
+            amount -= last - first + 1
+        raise ValueError("Not enough positions")
+
+    def take(self, amount: int):
+        while amount:
+            first, last = self.ranges[0]
+            used = min(amount, last - first + 1)
+            if first + used > last:
+                self.ranges.popleft()
+            else:
+                self.ranges[0] = (first + used, last)
+            amount -= used
+
+
+class DatabaseStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    'database://' storage for slowapi/limits, shared by every replica
+    through the rate_limit_counters table.
+
+    With the sliding-window-counter strategy a process claims blocks of
+    counter positions (one upsert on the async engine per block) and
+    decides hits locally from them. A block is RATE_LIMIT_LEASE_FRACTION
+    of the limit, at least RATE_LIMIT_LEASE_MIN hits, and the next one is
+    claimed in the background once half of the current one is used. Each
+    position is handed out once cluster-wide, so replicas together never
+    admit more than the limit; unused positions are lost, so they may
+    admit slightly fewer. Once a window is known to be full, rejections
+    are local too.
+
+    slowapi decides synchronously on the event loop, so every hit is first
+    reserved by reserve() (TimedLimiter.prepare, awaited before the check):
+    a process without positions for a key waits there for its claim, never
+    admits on credit. While claims fail, limits are kept per process and
+    claims are retried every CLAIM_RETRY_INTERVAL.
+    """
+    STORAGE_SCHEME = ["database"]
+
+    def __init__(self, uri: str | None = None, wrap_exceptions: bool = False,
+                 **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._leases: dict[str, _Lease] = {}
+        # Guards leases between requests and claim tasks; never held
+        # across I/O
+        self._lock = threading.Lock()
+        self._claims: set[asyncio.Task] = set()
+        self._pruned_at = 0.0
+        self._purged_at = 0.0
+        self._retry_at = 0.0 # Set after a failed claim
+
+    @property
+    def base_exceptions(self):
+        return SQLAlchemyError
+
+    # -- Fixed-window interface (one sync round-trip per hit) --
+    # Only used by the other strategies; the app uses the sliding window
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        with database.engine.begin() as conn:
+            hits, _ = conn.execute(_increment_statement(
+                conn.dialect.name, key, expiry, amount, time.time()
+            )).one()
+        return hits
+
+    def get(self, key: str) -> int:
+        with database.engine.connect() as conn:
+            row = conn.execute(_read_statement(key, time.time())).one_or_none()
+        return row.hits if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        with database.engine.connect() as conn:
+            row = conn.execute(_read_statement(key, now)).one_or_none()
+        return row.expires_at if row else now
+
+    def check(self) -> bool:
+        # Outcome of the last claim; no round-trip, slowapi calls this on
+        # the event loop
+        return time.monotonic() >= self._retry_at
+
+    def reset(self) -> int | None:
+        with self._lock:
+            self._leases.clear()
+            self._claims.clear()
+            self._retry_at = 0.0
+        with database.engine.begin() as conn:
+            return conn.execute(delete(RateLimitCounter)).rowcount
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._leases.pop(key, None)
+        with database.engine.begin() as conn:
+            conn.execute(delete(RateLimitCounter).where(RateLimitCounter.key == key))
+
+    # -- Sliding-window-counter interface (leased) --
+    async def reserve(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> _Lease | None:
+        """
+        Sets aside positions so the next acquire_sliding_window_entry() for
+        this hit is decided locally, waiting for a claim if none are left.
+        Returns the lease reserved on, or None if the window is known to be
+        full or claims fail (the hit is then decided without positions).
+        """
+        if amount > limit:
+            return None
+        while True:
+            with self._lock:
+                lease, previous_key, base = self._lease(key, limit, expiry, amount)
+                if lease.available() >= amount:
+                    lease.reserved += amount
+                    self._refill(lease, limit, base, previous_key, expiry)
+                    return lease
+                if self._full(lease, limit, base, amount) or not self.check():
+                    return None
+                claim = lease.claim or self._start_claim(
+                    lease, limit, base, previous_key, expiry, amount
+                )
+            await asyncio.shield(claim)
+
+    def release(self, reservations: dict):
+        """Returns what a request reserved but did not use."""
+        with self._lock:
+            for lease, amount in reservations.values():
+                lease.reserved -= amount
+
+    async def hit(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        """reserve() and acquire in one go, for callers outside slowapi."""
+        lease = await self.reserve(key, limit, expiry, amount)
+        reservations = {key: [lease, amount]} if lease is not None else {}
+        token = _reservations.set(reservations)
+        try:
+            return self.acquire_sliding_window_entry(key, limit, expiry, amount)
+        finally:
+            _reservations.reset(token)
+            self.release(reservations)
+
+    def acquire_sliding_window_entry(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> bool:
+        if amount > limit:
+            return False
+        recording = _recording.get()
+        if recording is not None:
+            recording.append((key, limit, expiry, amount))
+            return True
+
+        with self._lock:
+            lease, previous_key, base = self._lease(key, limit, expiry, amount)
+            reservation = (_reservations.get() or {}).get(key)
+            if reservation and reservation[0] is lease and reservation[1] >= amount:
+                reservation[1] -= amount
+                lease.reserved -= amount
+            elif lease.available() < amount:
+                if self.check():
+                    # Not prepared (or window known to be full): no credit
+                    self._refill(lease, limit, base, previous_key, expiry)
+                    return False
+                # Claims fail: per-process limit until they recover
+                lease.local += amount
+                return lease.local <= limit
+            allowed = math.floor(base + lease.position(amount)) <= limit
+            if allowed:
+                lease.take(amount)
+            self._refill(lease, limit, base, previous_key, expiry)
+            return allowed
+
+    def _lease(self, key: str, limit: int, expiry: int, amount: int):
+        """
+        (lease, previous window key, weighted previous count) for the key's
+        current window. Call with the lock held.
+        """
+        now = time.time()
+        if now - self._pruned_at > PURGE_INTERVAL:
+            self._leases = {
+                k: lease for k, lease in self._leases.items()
+                if lease.expires_at > now
+            }
+            self._pruned_at = now
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        lease = self._leases.get(key)
+        if lease is None or lease.window != current_key:
+            lease = self._leases[key] = _Lease(
+                window=current_key,
+                expires_at=now + 2 * expiry,
+                block=self._block_size(limit, amount),
+            )
+        # Share of the previous window still inside the sliding window
+        weight = 1 - (now / expiry) % 1
+        return lease, previous_key, lease.previous * weight
+
+    @staticmethod
+    def _block_size(limit: int, amount: int) -> int:
+        size = max(
+            constants.RATE_LIMIT_LEASE_MIN,
+            math.ceil(limit * constants.RATE_LIMIT_LEASE_FRACTION),
+        )
+        return max(amount, min(limit, size))
+
+    @staticmethod
+    def _full(lease: _Lease, limit: int, base: float, amount: int) -> bool:
+        return lease.claimed and math.floor(base + lease.seen) + amount > limit
+
+    def _refill(self, lease, limit, base, previous_key, expiry):
+        """Claims the next block in the background once half is used."""
+        if (lease.claim is None and self.check()
+                and not self._full(lease, limit, base, 1)
+                and lease.available() <= lease.block // 2):
+            self._start_claim(lease, limit, base, previous_key, expiry, 1)
+
+    def _start_claim(self, lease, limit, base, previous_key, expiry, amount):
+        # A block, but no more than looks free (positions past the limit
+        # are of no use to anyone)
+        free = limit - math.floor(base) - lease.seen
+        size = max(amount, min(free, lease.block))
+        lease.claim = asyncio.get_running_loop().create_task(
+            self._claim(lease, previous_key, expiry, size)
+        )
+        self._claims.add(lease.claim)
+        lease.claim.add_done_callback(self._claims.discard)
+        return lease.claim
+
+    async def _claim(self, lease: _Lease, previous_key: str, expiry: int,
+                     size: int) -> None:
+        """One round-trip: reserves 'size' positions in the lease's window."""
+        now = time.time()
+        try:
+            async with database.async_engine.begin() as conn:
+                # Twice the expiry: the row is still read as the previous window
+                hits, _ = (await conn.execute(_increment_statement(
+                    conn.dialect.name, lease.window, 2 * expiry, size, now
+                ))).one()
+                previous = (
+                    await conn.execute(_read_statement(previous_key, now))
+                ).one_or_none()
+                if now - self._purged_at > PURGE_INTERVAL:
+                    self._purged_at = now
+                    await conn.execute(delete(RateLimitCounter).where(
+                        RateLimitCounter.expires_at <= now
+                    ))
+        except (SQLAlchemyError, OSError) as e:
+            metrics_setup.RATE_LIMIT_LEASE_CLAIMS.labels(result="error").inc()
+            print(f"Rate limit claim failed, limiting per process: {e}")
+            with self._lock:
+                lease.claim = None
+                self._retry_at = time.monotonic() + CLAIM_RETRY_INTERVAL
+            return
+        metrics_setup.RATE_LIMIT_LEASE_CLAIMS.labels(result="ok").inc()
+
+        with self._lock:
+            lease.claim = None
+            lease.claimed = True
+            lease.previous = previous.hits if previous else 0
+            lease.seen = hits
+            lease.ranges.append((hits - size + 1, hits))
+
+    async def settle(self) -> None:
+        """Waits for the claims in flight (tests, benchmarks)."""
+        while self._claims:
+            await asyncio.gather(*self._claims)
+
+    def get_sliding_window(self, key: str, expiry: int):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        with database.engine.connect() as conn:
+            previous = conn.execute(_read_statement(previous_key, now)).one_or_none()
+            current = conn.execute(_read_statement(current_key, now)).one_or_none()
+        previous_ttl = (1 - (now / expiry) % 1) * expiry if previous else 0.0
+        current_ttl = (1 - (now / expiry) % 1) * expiry + expiry
+        return (
+            previous.hits if previous else 0, previous_ttl,
+            current.hits if current else 0, current_ttl,
+        )
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._leases.pop(key, None)
+        with database.engine.begin() as conn:
+            conn.execute(delete(RateLimitCounter).where(
+                RateLimitCounter.key.in_(self.sliding_window_keys(key, expiry, now))
+            ))
+
+
+# --- 3. LIMITER ---
+class TimedLimiter(Limiter):
+    """
+    slowapi Limiter that records how long each limit decision takes and,
+    with the database storage, prepares every decision asynchronously.
+    """
+
+    async def prepare(self, request: Request):
+        """
+        App-wide dependency, resolved before slowapi's synchronous check:
+        finds the hits the check will make (by running it with the storage
+        only recording them) and reserves each, waiting for a claim where
+        this process holds no positions. Unused reservations are released
+        after the request.
+        """
+        storage = self._storage
+        endpoint = request.scope.get("endpoint")
+        if (not isinstance(storage, DatabaseStorage) or endpoint is None
+                or self._storage_dead): # Memory fallback decides those
+            yield
+            return
+        hits = []
+        token = _recording.set(hits)
+        try:
+            Limiter._check_request_limit(self, request, endpoint, False)
+        finally:
+            _recording.reset(token)
+
+        reservations = {}
+        for key, limit, expiry, amount in hits:
+            lease = await storage.reserve(key, limit, expiry, amount)
+            if lease is not None:
+                reservations[key] = [lease, amount]
+        request.state.rate_limit_reservations = reservations
+        try:
+            yield
+        finally:
+            storage.release(reservations)
+
+    def _check_request_limit(self, request, endpoint_func, in_middleware=True):
+        # slowapi re-enters this once when it falls back to memory storage;
+        # only the outer call is timed
+        if getattr(request.state, "rate_limit_deciding", False):
+            super()._check_request_limit(request, endpoint_func, in_middleware)
+            return
+        request.state.rate_limit_deciding = True
+        token = _reservations.set(
+            getattr(request.state, "rate_limit_reservations", None)
+        )
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            super()._check_request_limit(request, endpoint_func, in_middleware)
+            outcome = "allowed"
+        except RateLimitExceeded:
+            outcome = "limited"
+            raise
+        finally:
+            _reservations.reset(token)
+            request.state.rate_limit_deciding = False
+            metrics_setup.RATE_LIMIT_DECISION_LATENCY.labels(outcome=outcome).observe(
+                time.perf_counter() - start
+            )
@@ -0,0 +1,107 @@
+import asyncio
+import random
+import time
+
+from app import metrics_setup, sync_jobs, upstream
+
+
+# --- 1. PERIODIC SYNC SCHEDULER ---
+class SyncScheduler:
+    """
+    Triggers a sync every 'interval' seconds through the job manager, so a
+    scheduled run coalesces with manual ones and honours the cross-replica
+    lock. The delay doubles per consecutive upstream 429/5xx failure and per
+    consecutive sync that changed nothing, up to 'max_interval'; every delay
+    gets +/- 'jitter' so replicas started together drift apart.
+
+    Every worker of every replica runs a scheduler. A scheduled run is
+    skipped when any of them synced within the current (unjittered)
+    interval minus the jitter, so the cluster syncs about once per
+    interval instead of once per scheduler.
+    """
+
+    def __init__(
+        self,
+        job_manager: sync_jobs.SyncJobManager,
+        interval: float,
+        jitter: float,
+        max_interval: float,
+        poll_interval: float = 1.0,
+    ):
+        self.job_manager = job_manager
+        self.interval = interval
+        self.jitter = jitter
+        self.max_interval = max(max_interval, interval)
+        self.poll_interval = poll_interval
+        self.upstream_failures = 0
+        self.idle_runs = 0
+        self.current_interval = interval # Before jitter
+        self._task = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def next_delay(self, job: sync_jobs.SyncJob) -> float:
+        """Updates the backoff/idle streaks from a finished job; returns the delay."""
+        if job.status == sync_jobs.FAILED and upstream.is_unavailable(job.exception):
+            self.upstream_failures += 1
+        elif job.status != sync_jobs.SKIPPED:
+            self.upstream_failures = 0
+
+        if job.status == sync_jobs.SUCCEEDED:
+            changed = sum(job.result[k] for k in ("inserted", "updated", "deleted"))
+            self.idle_runs = 0 if changed else self.idle_runs + 1
+
+        # Backoff takes precedence; the exponent is capped to stay finite
+        streak = self.upstream_failures or self.idle_runs
+        self.current_interval = min(
+            self.interval * 2 ** min(streak, 16), self.max_interval
+        )
+        return self._jittered(self.current_interval)
+
+    def _jittered(self, delay: float) -> float:
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def run_once(self) -> sync_jobs.SyncJob:
+        """Triggers a sync (or joins the running one) and waits for it."""
+        start = time.perf_counter()
+        # The earliest any scheduler fires again after a sync
+        job, _ = self.job_manager.submit(
+            skip_if_synced_within=self.current_interval * (1 - self.jitter)
+        )
+        while job.active:
+            await asyncio.sleep(self.poll_interval)
+        metrics_setup.SYNC_SCHEDULE_LAST_DURATION.set(time.perf_counter() - start)
+        metrics_setup.SYNC_SCHEDULE_LAST_RUN.set(time.time())
+        return job
+
+    async def _run(self):
+        # First run at a random point within one interval: a rollout that
+        # restarts every replica at once does not fire them all together
+        delay = random.uniform(0, self.interval)
+        while True:
+            metrics_setup.SYNC_SCHEDULE_NEXT_RUN.set(time.time() + delay)
+            await asyncio.sleep(delay)
+            try:
+                job = await self.run_once()
+                delay = self.next_delay(job)
+            except Exception as e:
+                # Never let the scheduler die; try again after one interval
+                print(f"Sync scheduler error: {e}")
+                delay = self._jittered(self.interval)
+            print(f"--- Next scheduled sync in {delay:.0f}s ---")
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
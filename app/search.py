@@ -0,0 +1,122 @@
+import bisect
+import heapq
+import re
+from collections import defaultdict
+
+from app import constants
+
+# Match tiers, best first
+EXACT = 0
+NAME_PREFIX = 1
+WORD_PREFIX = 2
+SUBSTRING = 3
+
+_WORD = re.compile(r"\w+")
+# Sorts after every real character: upper bound of a prefix range
+_MAX_CHAR = "\U0010ffff"
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# --- 1. IN-MEMORY NAME INDEX ---
+class CharacterIndex:
+    """
+    Immutable snapshot of the listing for one dataset version.
+
+    Prefix lookups bisect a sorted list holding each name plus every suffix
+    that starts at a word ("rick sanchez", "sanchez"), so "san" finds
+    "Rick Sanchez". Substring lookups intersect trigram posting sets and
+    verify the few candidates left. Queries of one or two characters, which
+    match a large share of the table, are answered from top-N lists ranked
+    at build time. None of the lookups scans the table.
+    """
+
+    def __init__(
+        self,
+        rows: list[dict],
+        version: int | None,
+        max_results: int = constants.SEARCH_LIMIT_MAX,
+    ):
+        self.version = version
+        self._rows = {row["id"]: row for row in rows}
+        self._names = {row["id"]: normalize(row["name"] or "") for row in rows}
+
+        keys = []
+        grams = defaultdict(set)
+        for char_id, name in self._names.items():
+            for match in _WORD.finditer(name):
+                tier = NAME_PREFIX if match.start() == 0 else WORD_PREFIX
+                keys.append((name[match.start():], tier, char_id))
+            for gram in trigrams(name):
+                grams[gram].add(char_id)
+        keys.sort()
+        self._keys = [key for key, _, _ in keys]
+        self._entries = [(tier, char_id) for _, tier, char_id in keys]
+        self._grams = {gram: frozenset(ids) for gram, ids in grams.items()}
+
+        short = defaultdict(dict)
+        for key, tier, char_id in keys:
+            for prefix in {key[:1], key[:2]}:
+                self._add_match(short[prefix], char_id, tier, prefix)
+        self._short = {
+            prefix: self._ranked(tiers, max_results)
+            for prefix, tiers in short.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def search(self, query: str, limit: int) -> list[dict]:
+        """Best 'limit' matches: exact, name prefix, word prefix, substring."""
+        q = normalize(query)
+        if not q:
+            return []
+        if len(q) <= 2:
+            return [self._rows[char_id] for char_id in self._short.get(q, ())][:limit]
+
+        tiers = {}
+        lo = bisect.bisect_left(self._keys, q)
+        hi = bisect.bisect_left(self._keys, q + _MAX_CHAR, lo)
+        for tier, char_id in self._entries[lo:hi]:
+            self._add_match(tiers, char_id, tier, q)
+
+        postings = sorted(
+            (self._grams.get(gram, frozenset()) for gram in trigrams(q)), key=len
+        )
+        for char_id in postings[0].intersection(*postings[1:]):
+            if char_id not in tiers and q in self._names[char_id]:
+                tiers[char_id] = SUBSTRING
+
+        return [self._rows[char_id] for char_id in self._ranked(tiers, limit)]
+
+    def _add_match(self, tiers: dict, char_id: int, tier: int, query: str):
+        if tier == NAME_PREFIX and self._names[char_id] == query:
+            tier = EXACT
+        tiers[char_id] = min(tier, tiers.get(char_id, SUBSTRING))
+
+    def _ranked(self, tiers: dict, limit: int) -> list[int]:
+        """Ids ordered by match tier, then shorter and alphabetically first names."""
+        best = heapq.nsmallest(
+            limit,
+            tiers.items(),
+            key=lambda item: (
+                item[1], len(self._names[item[0]]), self._names[item[0]], item[0]
+            ),
+        )
+        return [char_id for char_id, _ in best]
+
+
+# Replaced wholesale (never mutated) whenever the dataset version changes
+index = CharacterIndex([], version=None)
+
+
+def rebuild(rows: list[dict], version: int) -> CharacterIndex:
+    global index
+    index = CharacterIndex(rows, version)
+    return index
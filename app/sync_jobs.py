@@ -0,0 +1,266 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import constants, database
+from app.database import SyncJobRecord
+
+# Job lifecycle states
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+# Progress is written to the shared job table at most this often (seconds)
+PROGRESS_SAVE_INTERVAL = 1.0
+
+
+class JobSkipped(Exception):
+    """Raised by a job that found its work already being done elsewhere."""
+
+
+# --- 1. JOB STATE ---
+class SyncJob:
+    """
+    Progress and outcome of one background sync run.
+    Only the sync's own threads write to it (each counter from a single
+    thread); readers get a snapshot via to_dict(). If 'on_progress' is set
+    (by the manager), it is called at most every PROGRESS_SAVE_INTERVAL.
+    """
+
+    def __init__(self, profile: bool = False,
+                 skip_if_synced_within: float | None = None):
+        self.id = uuid.uuid4().hex
+        self.profile = profile # Capture a cProfile artifact of the run
+        # Scheduled runs: skip if any process synced less than this ago
+        self.skip_if_synced_within = skip_if_synced_within
+        self.profile_id = None
+        self.phases_ms = None
+        self.status = PENDING
+        self.pages_done = 0
+        self.rows_written = 0
+        self.result = None
+        self.error = None
+        self.exception = None # The raised exception itself, for callers
+        self.created_at = time.time()
+        self.started_at = None # Wall clock, for other processes
+        self.on_progress = None
+        self._progress_at = 0.0
+        self._started = None
+        self._finished = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (PENDING, RUNNING)
+
+    def record_page(self):
+        self.pages_done += 1
+        self._report_progress()
+
+    def record_rows(self, count: int):
+        self.rows_written += count
+        self._report_progress()
+
+    def _report_progress(self):
+        now = time.monotonic()
+        if self.on_progress is None or now - self._progress_at < PROGRESS_SAVE_INTERVAL:
+            return
+        self._progress_at = now
+        self.on_progress(self)
+
+    def elapsed_seconds(self) -> float:
+        if self._started is None:
+            return 0.0
+        end = self._finished if self._finished is not None else time.monotonic()
+        return round(end - self._started, 3)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "rows_written": self.rows_written,
+            "elapsed_seconds": self.elapsed_seconds(),
+            "result": self.result,
+            "error": self.error,
+            "phases_ms": self.phases_ms,
+            "profile_id": self.profile_id,
+        }
+
+
+# --- 2. SHARED JOB STATUS ---
+# Jobs run in one worker of one replica; their status is mirrored to the
+# sync_jobs table so GET /sync/{job_id} works wherever it is routed.
+def _upsert(dialect: str, job: SyncJob, replica: str):
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    finished_at = None
+    if job._finished is not None:
+        finished_at = job.started_at + (job._finished - job._started)
+    values = {
+        "replica": replica,
+        "status": job.status,
+        "pages_done": job.pages_done,
+        "rows_written": job.rows_written,
+        "started_at": job.started_at,
+        "finished_at": finished_at,
+        "result": job.result,
+        "error": job.error,
+        "phases_ms": job.phases_ms,
+        "profile_id": job.profile_id,
+    }
+    return insert(SyncJobRecord).values(
+        id=job.id, created_at=job.created_at, **values
+    ), values
+
+
+def save_job(job: SyncJob, replica: str):
+    """Upserts the job's status row (sync engine: called from job threads)."""
+    with database.engine.begin() as conn:
+        statement, values = _upsert(conn.dialect.name, job, replica)
+        conn.execute(statement.on_conflict_do_update(
+            index_elements=[SyncJobRecord.id], set_=values
+        ))
+
+
+async def register_job(job: SyncJob, replica: str):
+    """
+    Records a new job before its id is handed out, unless the job thread
+    already saved it. Old records are pruned here.
+    """
+    async with database.async_engine.begin() as conn:
+        statement, _ = _upsert(conn.dialect.name, job, replica)
+        await conn.execute(
+            statement.on_conflict_do_nothing(index_elements=[SyncJobRecord.id])
+        )
+        await conn.execute(delete(SyncJobRecord).where(
+            SyncJobRecord.created_at < time.time() - constants.SYNC_JOB_RETENTION
+        ))
+
+
+async def load_job(job_id: str) -> dict | None:
+    """A job's status as last saved by the process running it, or None."""
+    async with database.async_engine.connect() as conn:
+        record = (await conn.execute(
+            select(SyncJobRecord).where(SyncJobRecord.id == job_id)
+        )).first()
+    if record is None:
+        return None
+    elapsed = 0.0
+    if record.started_at is not None:
+        end = record.finished_at if record.finished_at is not None else time.time()
+        elapsed = round(end - record.started_at, 3)
+    return {
+        "job_id": record.id,
+        "status": record.status,
+        "pages_done": record.pages_done,
+        "rows_written": record.rows_written,
+        "elapsed_seconds": elapsed,
+        "result": record.result,
+        "error": record.error,
+        "phases_ms": record.phases_ms,
+        "profile_id": record.profile_id,
+    }
+
+
+# --- 3. JOB MANAGER ---
+class SyncJobManager:
+    """
+    Runs sync jobs off the event loop, one at a time per process.
+    A trigger while a job is pending/running coalesces into that job.
+    With a 'replica' id, every status change (and progress, throttled) is
+    saved to the shared job table; get() only knows this process's jobs,
+    load_job() any process's.
+    """
+
+    def __init__(self, run_job, max_history: int = 20, replica: str | None = None):
+        self._run_job = run_job
+        self._max_history = max_history
+        self._replica = replica
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._current = None
+        self._executor = None
+
+    def submit(
+        self, profile: bool = False, skip_if_synced_within: float | None = None
+    ) -> tuple[SyncJob, bool]:
+        """
+        Returns (job, created). created is False when coalesced (a coalesced
+        trigger does not change whether the running job is profiled).
+        """
+        with self._lock:
+            if self._current is not None and self._current.active:
+                return self._current, False
+
+            job = SyncJob(
+                profile=profile, skip_if_synced_within=skip_if_synced_within
+            )
+            if self._replica is not None:
+                job.on_progress = self._save
+            self._jobs[job.id] = job
+            # Keep only the most recent jobs for the status API
+            while len(self._jobs) > self._max_history:
+                self._jobs.popitem(last=False)
+            self._current = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="sync"
+                )
+            self._executor.submit(self._execute, job)
+            return job, True
+
+    def get(self, job_id: str) -> SyncJob | None:
+        return self._jobs.get(job_id)
+
+    async def register(self, job: SyncJob):
+        """Saves a just-submitted job so other processes can report it."""
+        if self._replica is not None:
+            await register_job(job, self._replica)
+
+    def _save(self, job: SyncJob):
+        if self._replica is None:
+            return
+        try:
+            save_job(job, self._replica)
+        except Exception as e:
+            # Never fail a sync over its status report
+            print(f"Could not save status of sync job {job.id}: {e}")
+
+    def _execute(self, job: SyncJob):
+        job.status = RUNNING
+        job.started_at = time.time()
+        job._started = time.monotonic()
+        self._save(job)
+        try:
+            job.result = self._run_job(job)
+            job.status = SUCCEEDED
+        except JobSkipped as e:
+            job.error = str(e)
+            job.status = SKIPPED
+        except Exception as e:
+            # Log the failure, the status API reports it as well
+            print(f"Sync job {job.id} failed: {e}")
+            job.error = str(e)
+            job.exception = e
+            job.status = FAILED
+        finally:
+            job._finished = time.monotonic()
+            self._save(job)
+
+    def shutdown(self):
+        """Stops accepting work; a running job is left to finish on its thread."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._current is not None and self._current.status == PENDING:
+                self._current.status = FAILED
+                self._current.error = "Cancelled at shutdown"
+                self._save(self._current)
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import RetryError
+
+from app import constants, metrics_setup
+
+
+class UpstreamUnavailableError(Exception):
+    """The upstream answered 429 or 5xx; worth retrying later."""
+
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        super().__init__(
+            f"External API failed with status {status_code}. Retrying..."
+        )
+
+
+def is_unavailable(exc: BaseException | None) -> bool:
+    """True for a 429/5xx failure, also once the retry policy gave up on it."""
+    if isinstance(exc, RetryError):
+        exc = exc.last_attempt.exception()
+    return isinstance(exc, UpstreamUnavailableError)
+
+
+# --- 1. ON-DISK CONDITIONAL CACHE ---
+class PageCache:
+    """
+    Stores each page's raw body next to its ETag / Last-Modified validators,
+    so the next sync can revalidate with a conditional request. The parsed
+    JSON of recent pages is also kept in memory: a 304 then costs neither a
+    download nor a parse.
+    """
+
+    def __init__(self, directory: str, max_parsed: int = 256):
+        self.directory = directory
+        self.max_parsed = max_parsed
+        self._parsed = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def validators(self, key: str) -> dict | None:
+        try:
+            with open(self._path(key, "meta")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, key: str, validators: dict) -> dict | None:
+        """Parsed body for a revalidated entry (memory first, then disk)."""
+        with self._lock:
+            parsed = self._parsed.get(key)
+            if parsed and parsed[0] == validators:
+                self._parsed.move_to_end(key)
+                return parsed[1]
+        try:
+            with open(self._path(key, "body"), "rb") as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        self._remember(key, validators, data)
+        return data
+
+    def store(self, key: str, validators: dict, body: bytes, data: dict):
+        # Body first, then meta: a crash in between leaves no validator
+        # pointing at a missing/partial body
+        self._atomic_write(self._path(key, "body"), body)
+        self._atomic_write(self._path(key, "meta"), json.dumps(validators).encode())
+        self._remember(key, validators, data)
+
+    def _remember(self, key: str, validators: dict, data: dict):
+        with self._lock:
+            self._parsed[key] = (validators, data)
+            self._parsed.move_to_end(key)
+            while len(self._parsed) > self.max_parsed:
+                self._parsed.popitem(last=False)
+
+    def _atomic_write(self, path: str, payload: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+
+# --- 2. POOLED KEEP-ALIVE CLIENT ---
+class UpstreamClient:
+    """
+    One shared requests.Session for every page fetch, so connections (and
+    their TCP+TLS handshakes) are reused across pages and syncs.
+    """
+
+    def __init__(self, pool_size: int, timeout: float, cache_dir: str | None):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.cache = PageCache(cache_dir) if cache_dir else None
+
+    @staticmethod
+    def cache_key(url: str, params: dict | None) -> str:
+        request = requests.Request("GET", url, params=params).prepare()
+        return hashlib.sha1(request.url.encode()).hexdigest()
+
+    def get_json(self, url: str, params: dict | None = None) -> dict:
+        start = time.perf_counter()
+        result = "error"
+        try:
+            data, result = self._fetch(url, params)
+            return data
+        finally:
+            metrics_setup.UPSTREAM_FETCH_LATENCY.labels(result=result).observe(
+                time.perf_counter() - start
+            )
+
+    def _fetch(self, url: str, params: dict | None) -> tuple[dict, str]:
+        key = validators = None
+        headers = {}
+        if self.cache:
+            key = self.cache_key(url, params)
+            validators = self.cache.validators(key)
+            if validators:
+                if validators.get("etag"):
+                    headers["If-None-Match"] = validators["etag"]
+                if validators.get("last_modified"):
+                    headers["If-Modified-Since"] = validators["last_modified"]
+
+        response = self.session.get(
+            url, params=params, headers=headers, timeout=self.timeout
+        )
+
+        if response.status_code == 304 and validators:
+            data = self.cache.load(key, validators)
+            if data is not None:
+                metrics_setup.UPSTREAM_CACHE_REQUESTS.labels(result="hit").inc()
+                return data, "not_modified"
+            # Cached body vanished: fetch it again unconditionally
+            response = self.session.get(url, params=params, timeout=self.timeout)
+
+        # Retry on 429 (Rate Limit) or 5xx (Server Error)
+        if response.status_code >= 429:
+            raise UpstreamUnavailableError(response.status_code)
+
+        # Fail fast on other 4xx client errors
+        response.raise_for_status()
+        data = response.json()
+
+        if self.cache:
+            metrics_setup.UPSTREAM_CACHE_REQUESTS.labels(result="miss").inc()
+            new_validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+            if any(new_validators.values()):
+                self.cache.store(key, new_validators, response.content, data)
+        return data, "ok"
+
+
+client = UpstreamClient(
+    constants.UPSTREAM_POOL_SIZE,
+    constants.UPSTREAM_TIMEOUT,
+    constants.UPSTREAM_CACHE_DIR,
+)
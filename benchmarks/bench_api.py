@@ -0,0 +1,157 @@
+"""
+Load-tests the running app over real HTTP: /api/v1/characters for each
+sort_by variant and /healthcheck, reporting p50/p90/p99 latency and
+throughput at the given concurrency levels.
+
+The app is served by uvicorn on a local port (full lifespan: migrations,
+cache warm-up, health monitor) against a seeded database. Rate limiting is
+switched off for the run. Client and server share one process, so use
+the numbers to compare runs rather than as absolute capacity.
+
+Usage: python -m benchmarks.bench_api [--rows 1000] [--concurrency 1 16]
+           [--requests 500] [--output api.json]
+Emits one JSON document; runs on SQLite and, if BENCH_POSTGRES_URL is
+set, Postgres.
+"""
+import argparse
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from app import constants, database, main
+from benchmarks import harness
+
+SCENARIOS = {
+    "characters": "/api/v1/characters",
+    "characters_sort_name": "/api/v1/characters?sort_by=name",
+    "characters_sort_id": "/api/v1/characters?sort_by=id",
+    "healthcheck": "/healthcheck",
+}
+
+
+def seed(rows: int):
+    db = database.SessionLocal()
+    try:
+        database.bulk_upsert_characters(db, [
+            {
+                "id": char_id,
+                "name": f"Rick Sanchez {rows - char_id}",
+                "species": constants.EXTERNAL_FILTERS["species"],
+                "status": constants.EXTERNAL_FILTERS["status"],
+                "origin_name": "Earth (C-137)",
+                "is_earth_origin": True,
+                "is_deleted": False,
+            }
+            for char_id in range(1, rows + 1)
+        ], batch_size=5000)
+    finally:
+        db.close()
+
+
+class LocalServer:
+    """Runs the app with uvicorn on a background thread."""
+
+    def __init__(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(
+            main.app, host="127.0.0.1", port=self.port, log_level="warning"
+        ))
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self._thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self._thread.join()
+
+
+async def load(base_url: str, path: str, concurrency: int, total: int,
+               warmup: int) -> dict:
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(warmup + total):
+        queue.put_nowait(i >= warmup) # False while warming up
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while not queue.empty():
+            measured = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path)
+            elapsed = time.perf_counter() - start
+            if measured:
+                latencies.append(elapsed)
+                errors += response.status_code >= 400
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall_s = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_s": round(len(latencies) / wall_s, 1),
+        **harness.percentiles(latencies),
+    }
+
+
+def run(rows: int, concurrency_levels, total: int, warmup: int) -> dict:
+    results = []
+    limiter_enabled = main.limiter.enabled
+    main.limiter.enabled = False
+    try:
+        for target, url in harness.database_targets().items():
+            with harness.use_database(url):
+                seed(rows)
+                with LocalServer() as server:
+                    for name, path in SCENARIOS.items():
+                        for concurrency in concurrency_levels:
+                            stats = asyncio.run(load(
+                                server.base_url, path, concurrency, total, warmup
+                            ))
+                            results.append({
+                                "database": target, "scenario": name,
+                                "path": path, **stats,
+                            })
+    finally:
+        main.limiter.enabled = limiter_enabled
+    return {
+        "benchmark": "api",
+        "params": {"rows": rows, "requests": total, "warmup": warmup},
+        "results": results,
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+
+
+def run_from_args(args) -> dict:
+    return run(args.rows, args.concurrency, args.requests, args.warmup)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_arguments(parser)
+    parser.add_argument("--output", help="JSON file to write (default: stdout)")
+    args = parser.parse_args()
+    harness.emit(run_from_args(args), args.output)
@@ -0,0 +1,99 @@
+"""
+Measures ingest_all_characters against the local fake upstream:
+wall time and rows/s per page count, for a cold sync (empty DB, empty
+upstream cache) and a warm re-sync (every page revalidated with a 304,
+every row unchanged).
+
+Usage: python -m benchmarks.bench_ingest [--pages 5 20 80] [--output ingest.json]
+Emits one JSON document; runs on SQLite and, if BENCH_POSTGRES_URL is
+set, Postgres.
+"""
+import argparse
+import tempfile
+import time
+
+from app import constants, main, upstream
+from benchmarks import harness
+from benchmarks.fake_upstream import FakeUpstream
+
+
+def timed_ingest() -> tuple[dict, float]:
+    db = main.database.SessionLocal()
+    try:
+        start = time.perf_counter()
+        counts = main.ingest_all_characters(db)
+        return counts, time.perf_counter() - start
+    finally:
+        db.close()
+
+
+def summary(counts: dict, wall_s: float, pages: int) -> dict:
+    return {
+        "wall_s": round(wall_s, 4),
+        "pages_per_s": round(pages / wall_s, 1),
+        "rows_per_s": round(counts["processed"] / wall_s, 1),
+        "counts": counts,
+    }
+
+
+def run(page_counts, page_size: int, latency_ms: float, error_rate: float,
+        padding: int) -> dict:
+    results = []
+    saved = (constants.EXTERNAL_API_URL, upstream.client)
+    try:
+        for target, url in harness.database_targets().items():
+            for pages in page_counts:
+                fake = FakeUpstream(pages, page_size, latency_ms, error_rate, padding)
+                with fake, harness.use_database(url):
+                    constants.EXTERNAL_API_URL = fake.url
+                    # Fresh client per run: empty on-disk conditional cache
+                    upstream.client = upstream.UpstreamClient(
+                        constants.UPSTREAM_POOL_SIZE,
+                        constants.UPSTREAM_TIMEOUT,
+                        tempfile.mkdtemp(),
+                    )
+                    cold = summary(*timed_ingest(), pages)
+                    warm = summary(*timed_ingest(), pages)
+                results.append({
+                    "database": target,
+                    "pages": pages,
+                    "rows_upstream": pages * page_size,
+                    "upstream_requests": fake.requests,
+                    "upstream_throttled": fake.throttled,
+                    "cold": cold,
+                    "warm": warm,
+                })
+    finally:
+        constants.EXTERNAL_API_URL, upstream.client = saved
+    return {
+        "benchmark": "ingest",
+        "params": {
+            "page_size": page_size, "latency_ms": latency_ms,
+            "error_rate": error_rate, "padding": padding,
+            "concurrency": constants.SYNC_CONCURRENCY,
+            "batch_size": constants.UPSERT_BATCH_SIZE,
+        },
+        "results": results,
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 80])
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    # Throttled pages go through the real retry policy (2s+ backoff)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--padding", type=int, default=0)
+
+
+def run_from_args(args) -> dict:
+    return run(args.pages, args.page_size, args.latency_ms, args.error_rate,
+               args.padding)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_arguments(parser)
+    parser.add_argument("--output", help="JSON file to write (default: stdout)")
+    args = parser.parse_args()
+    harness.emit(run_from_args(args), args.output)
@@ -0,0 +1,95 @@
+"""
+Compares the two /api/v1/characters serialization paths:
+
+* orm:  ORM objects -> jsonable_encoder -> JSONResponse (the original path)
+* fast: column tuples -> dicts -> orjson (the current path)
+
+Usage: python -m benchmarks.bench_serialization [--rows 1000 10000 100000]
+Prints one JSON document with the median timings per row count.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.responses import JSONResponse
+
+from app import constants, database, main
+from app.database import Character
+
+
+def seed(session, rows: int):
+    characters = [
+        {
+            "id": char_id,
+            "name": f"Rick Sanchez {char_id}",
+            "species": constants.EXTERNAL_FILTERS["species"],
+            "status": constants.EXTERNAL_FILTERS["status"],
+            "origin_name": "Earth (C-137)",
+            "is_earth_origin": True,
+            "is_deleted": False,
+        }
+        for char_id in range(1, rows + 1)
+    ]
+    database.bulk_upsert_characters(session, characters, batch_size=5000)
+
+
+def orm_path(session) -> bytes:
+    characters = session.query(Character).filter(
+        Character.species == constants.EXTERNAL_FILTERS["species"],
+        Character.status == constants.EXTERNAL_FILTERS["status"],
+        Character.is_earth_origin,
+    ).order_by(Character.id).all()
+    return JSONResponse(content=jsonable_encoder(characters)).body
+
+
+def fast_path(session) -> bytes:
+    result = session.execute(main.characters_query().order_by(Character.id))
+    return main.encode_json(main.rows_as_dicts(result))
+
+
+def measure(func, session, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        session.expunge_all() # No identity-map reuse between runs
+        start = time.perf_counter()
+        func(session)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(row_counts, repeat: int) -> dict:
+    results = []
+    for rows in row_counts:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        database.Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        try:
+            seed(session, rows)
+            orm_s = measure(orm_path, session, repeat)
+            fast_s = measure(fast_path, session, repeat)
+            results.append({
+                "rows": rows,
+                "orm_ms": round(orm_s * 1000, 2),
+                "fast_ms": round(fast_s * 1000, 2),
+                "speedup": round(orm_s / fast_s, 2),
+                "body_bytes": len(fast_path(session)),
+            })
+        finally:
+            session.close()
+            engine.dispose()
+    return {"benchmark": "serialization", "repeat": repeat, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
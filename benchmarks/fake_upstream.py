@@ -0,0 +1,168 @@
+"""
+Local stand-in for the Rick & Morty character API, for offline benchmarks.
+
+Serves GET /api/character?page=N with 'pages' pages of 'page_size'
+characters each (same shape as the real API, deterministic content),
+with optional per-request latency, 429 injection and payload padding.
+Pages carry an ETag and honour If-None-Match like the real API.
+
+Usage: python -m benchmarks.fake_upstream [--pages 42] [--latency-ms 50]
+Embedded: with FakeUpstream(pages=10) as api: ... api.url ...
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ORIGINS = ["Earth (C-137)", "Earth (Replacement Dimension)", "Citadel of Ricks"]
+
+
+def character(char_id: int, padding: int) -> dict:
+    return {
+        "id": char_id,
+        "name": f"Rick Sanchez {char_id}",
+        "status": "Alive",
+        "species": "Human",
+        "origin": {"name": ORIGINS[char_id % len(ORIGINS)], "url": ""},
+        # Stands in for the fields the app ignores (episode lists, urls...)
+        "episode": ["x" * padding] if padding else [],
+    }
+
+
+class FakeUpstream:
+    """Threaded HTTP server on 127.0.0.1; a random free port unless given."""
+
+    def __init__(
+        self,
+        pages: int = 10,
+        page_size: int = 20,
+        latency_ms: float = 0.0,
+        error_rate: float = 0.0,
+        padding: int = 0,
+        port: int = 0,
+        seed: int = 0,
+    ):
+        self.pages = pages
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.padding = padding
+        self.requests = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/api/character"
+
+    def page_body(self, page: int) -> tuple[bytes, str]:
+        """Encoded page and its ETag (built once, then served from memory)."""
+        if page not in self._bodies:
+            first_id = (page - 1) * self.page_size + 1
+            next_url = f"{self.url}?page={page + 1}" if page < self.pages else None
+            body = json.dumps({
+                "info": {
+                    "count": self.pages * self.page_size,
+                    "pages": self.pages,
+                    "next": next_url,
+                    "prev": f"{self.url}?page={page - 1}" if page > 1 else None,
+                },
+                "results": [
+                    character(char_id, self.padding)
+                    for char_id in range(first_id, first_id + self.page_size)
+                ],
+            }).encode()
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            self._bodies[page] = (body, etag)
+        return self._bodies[page]
+
+    def _should_throttle(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            throttle = self._random.random() < self.error_rate
+            self.throttled += throttle
+        return throttle
+
+    def _handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if upstream.latency_ms:
+                    time.sleep(upstream.latency_ms / 1000)
+                if upstream._should_throttle():
+                    self.send_response(429)
+                    self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                query = parse_qs(urlparse(self.path).query)
+                page = int(query.get("page", ["1"])[0])
+                if not 1 <= page <= upstream.pages:
+                    self.send_error(404)
+                    return
+
+                body, etag = upstream.page_body(page)
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Keep benchmark output clean
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=42)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--padding", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    server = FakeUpstream(
+        args.pages, args.page_size, args.latency_ms, args.error_rate,
+        args.padding, args.port,
+    )
+    print(f"Fake upstream serving {args.pages} pages at {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
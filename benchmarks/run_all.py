@@ -0,0 +1,41 @@
+"""
+Runs every benchmark with its default settings and writes one combined
+JSON file, the baseline to diff before/after a performance change.
+
+Usage: python -m benchmarks.run_all [--output benchmark-results.json] [--quick]
+"""
+import argparse
+
+from benchmarks import bench_api, bench_ingest, bench_serialization, harness
+
+QUICK = {
+    "ingest": ["--pages", "5", "--latency-ms", "5"],
+    "api": ["--rows", "200", "--requests", "100", "--concurrency", "1", "4"],
+}
+
+
+def parse(add_arguments, argv: list[str]):
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument(
+        "--quick", action="store_true", help="Small sizes, for a smoke run"
+    )
+    args = parser.parse_args()
+
+    quick = QUICK if args.quick else {"ingest": [], "api": []}
+    ingest_args = parse(bench_ingest.add_arguments, quick["ingest"])
+    api_args = parse(bench_api.add_arguments, quick["api"])
+    serialization_rows = [1000] if args.quick else [1000, 10000, 100000]
+
+    harness.emit({
+        "benchmark": "all",
+        "ingest": bench_ingest.run_from_args(ingest_args),
+        "api": bench_api.run_from_args(api_args),
+        "serialization": bench_serialization.run(serialization_rows, repeat=5),
+    }, args.output)
@@ -0,0 +1,11 @@
+#!/bin/sh
+# Starts the API with a single uvicorn process (default) or, when
+# WEB_CONCURRENCY > 1, with gunicorn managing several uvicorn workers and
+# Prometheus multiprocess metrics (see app/gunicorn_conf.py).
+set -e
+
+if [ "${WEB_CONCURRENCY:-1}" -gt 1 ]; then
+    exec gunicorn -c app/gunicorn_conf.py app.main:app
+fi
+
+exec uvicorn app.main:app --host 0.0.0.0 --port "${PORT:-8000}"
@@ -1,28 +1,37 @@
 import os
+import tempfile
+import time
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 # 1. Import the *modules* themselves so we can patch them
-from app import database, main
+from app import cache, database, health, main
 
 # 2. Define Test DB URL
 # IMPORTANT: Override the production DATABASE_URL env var just in case
 os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 
-# 3. Create the test engine
-DATABASE_URL_TEST = "sqlite:///:memory:"
+# 3. Create the test engines
+# A throwaway SQLite *file*: the sync engine (ingestion, background thread) and
+# the async engine (request path) must see the same database, which separate
+# in-memory connections would not.
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+DATABASE_URL_TEST = f"sqlite:///{TEST_DB_PATH}"
 
 test_engine = create_engine(
     DATABASE_URL_TEST,
     # 'check_same_thread' is only needed for SQLite
     connect_args={"check_same_thread": False}
 )
+test_async_engine = create_async_engine(database.async_database_url(DATABASE_URL_TEST))
 
-# 4. Create the test session
+# 4. Create the test sessions
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+TestingAsyncSessionLocal = async_sessionmaker(test_async_engine, expire_on_commit=False)
 
 
 # 5. --- THIS IS THE MAGIC ---
@@ -31,6 +40,8 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_
 # from 'app.database' will get our test versions.
 database.engine = test_engine
 database.SessionLocal = TestingSessionLocal
+database.async_engine = test_async_engine
+database.AsyncSessionLocal = TestingAsyncSessionLocal
 # -----------------------------
 
 
@@ -47,7 +58,12 @@ def override_get_db():
     finally:
         db.close()
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
 app.dependency_overrides[database.get_db] = override_get_db
+app.dependency_overrides[database.get_async_db] = override_get_async_db
 
 
 # 8. The main "client" fixture
@@ -59,8 +75,34 @@ def client():
     # Create all tables on the *test* engine
     Base.metadata.create_all(bind=test_engine)
 
+    # Rate-limit counters, cached responses and DB health live in process
+    # memory; start every test fresh
+    main.limiter.reset()
+    cache.response_cache.clear()
+    health.breaker.record_success()
+    health.monitor.healthy = None
+
     with TestClient(app) as test_client:
         yield test_client # The test runs here
 
     # Drop all tables from the *test* engine
     Base.metadata.drop_all(bind=test_engine)
+
+
+# 9. Helper fixture: trigger /sync and wait for the background job to finish
+@pytest.fixture
+def run_sync(client):
+    def _run_sync(timeout: float = 5.0) -> dict:
+        response = client.post("/sync")
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = client.get(f"/sync/{job_id}").json()
+            if job["status"] in ("succeeded", "failed", "skipped"):
+                return job
+            time.sleep(0.01)
+        raise AssertionError(f"Sync job {job_id} did not finish in {timeout}s")
+
+    return _run_sync
@@ -0,0 +1,100 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from app import compression
+
+CHARACTERS = [
+    {"id": char_id, "name": f"Rick {char_id}", "species": "Human",
+     "status": "Alive", "origin": {"name": "Earth (C-137)"}}
+    for char_id in range(1, 4)
+]
+
+
+@pytest.fixture
+def synced(client, mocker, run_sync):
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None}, "results": CHARACTERS
+    })
+    run_sync()
+    return client
+
+
+@pytest.mark.unit
+def test_negotiate_accept_encoding(mocker):
+    """
+    Unit test:
+    The highest q-value wins, ties go to brotli, q=0 refuses a coding and
+    brotli is never offered when the module is missing.
+    """
+    mocker.patch("app.compression.brotli", object()) # Negotiation only
+    assert compression.negotiate(None) is None
+    assert compression.negotiate("identity") is None
+    assert compression.negotiate("gzip, deflate") == "gzip"
+    assert compression.negotiate("gzip, br") == "br"
+    assert compression.negotiate("br;q=0.5, gzip") == "gzip"
+    assert compression.negotiate("GZIP;q=0") is None
+    assert compression.negotiate("*") == "br"
+    assert compression.negotiate("*, br;q=0") == "gzip"
+
+    mocker.patch("app.compression.brotli", None)
+    assert compression.negotiate("br, gzip;q=0.1") == "gzip"
+    assert compression.negotiate("br") is None
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("encoding", [
+    "gzip",
+    pytest.param("br", marks=pytest.mark.skipif(
+        compression.brotli is None, reason="brotli not installed"
+    )),
+])
+def test_listing_compressed_once_per_version(synced, mocker, encoding):
+    """
+    Integration test:
+    The full listing is compressed on first request, then served from the
+    cache; each coding has its own ETag and the response varies on it.
+    """
+    mocker.patch("app.constants.COMPRESSION_MIN_SIZE", 0)
+    compress = mocker.spy(compression, "compress")
+
+    plain = synced.get("/api/v1/characters", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    for _ in range(2):
+        response = synced.get(
+            "/api/v1/characters", headers={"Accept-Encoding": encoding}
+        )
+        assert response.headers["content-encoding"] == encoding
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.json() == plain.json() # Decoded by the client
+    assert compress.call_count == 1
+
+    etag = response.headers["etag"]
+    assert etag != plain.headers["etag"]
+    revalidated = synced.get("/api/v1/characters", headers={
+        "Accept-Encoding": encoding, "If-None-Match": etag
+    })
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.integration
+def test_small_bodies_not_compressed(synced):
+    """
+    Integration test:
+    Bodies under COMPRESSION_MIN_SIZE go out as identity, still with Vary.
+    A small full listing asked for with gzip is a cache hit once served.
+    """
+    response = synced.get(
+        "/api/v1/characters?limit=1", headers={"Accept-Encoding": "gzip"}
+    )
+    assert len(response.content) < 1024
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    synced.get("/api/v1/characters", headers={"Accept-Encoding": "gzip"})
+    misses = REGISTRY.get_sample_value("app_response_cache_misses_total")
+    hits = REGISTRY.get_sample_value("app_response_cache_hits_total")
+    response = synced.get("/api/v1/characters", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert REGISTRY.get_sample_value("app_response_cache_misses_total") == misses
+    assert REGISTRY.get_sample_value("app_response_cache_hits_total") == hits + 1
@@ -0,0 +1,190 @@
+import pytest
+from sqlalchemy import update
+
+from app import cache, coordination, database, health
+
+RICK = {"id": 1, "name": "Rick", "species": "Human", "status": "Alive",
+        "origin": {"name": "Earth (C-137)"}}
+
+
+@pytest.mark.integration
+def test_sync_lock_excludes_other_replicas(client, monkeypatch):
+    """
+    Integration test:
+    While one replica holds the lock-table lease, another cannot take it
+    until it is released or the lease expires.
+    """
+    with coordination.sync_lock() as acquired:
+        assert acquired
+        monkeypatch.setattr(coordination, "REPLICA_ID", "other-pod:1")
+        with coordination.sync_lock() as other_acquired:
+            assert not other_acquired
+        monkeypatch.undo()
+
+    monkeypatch.setattr(coordination, "REPLICA_ID", "other-pod:1")
+    with coordination.sync_lock() as acquired:
+        assert acquired
+
+    # A lease left behind by a crashed replica expires
+    with database.engine.begin() as conn:
+        conn.execute(update(database.SyncState).values(
+            lock_holder="crashed-pod:1", lock_expires_at=0
+        ))
+    with coordination.sync_lock() as acquired:
+        assert acquired
+
+
+@pytest.mark.integration
+def test_sync_defers_to_replica_holding_lock(client, mocker, run_sync):
+    """
+    Integration test:
+    POST /sync reports the other replica's run instead of starting one,
+    and a job that loses the race is skipped without calling upstream.
+    """
+    fetch = mocker.patch("app.main.resilient_request")
+    with database.engine.begin() as conn:
+        conn.execute(update(database.SyncState).values(
+            lock_holder="other-pod:1", lock_expires_at=2e9
+        ))
+
+    response = client.post("/sync")
+    assert response.status_code == 202
+    assert response.json() == {
+        "message": "Sync already running on another replica",
+        "status": "running",
+        "holder": "other-pod:1",
+    }
+
+    # Lock taken between the check and the worker picking the job up
+    mocker.patch("app.coordination.sync_lock_holder", return_value=None)
+    job = run_sync()
+    assert job["status"] == "skipped"
+    fetch.assert_not_called()
+
+
+@pytest.mark.integration
+def test_dataset_version_shared_through_db(client, mocker, run_sync):
+    """
+    Integration test:
+    A sync that writes rows publishes a new version in the DB (one that
+    changes nothing keeps it); a replica that did not run the sync adopts it
+    on refresh and drops its cached bodies.
+    """
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None}, "results": [RICK]
+    })
+    before = cache.current_version()
+    run_sync()
+    assert cache.current_version() == before + 1
+    run_sync() # Incremental: nothing changed
+    assert cache.current_version() == before + 1
+
+    client.get("/api/v1/characters")
+    assert len(cache.response_cache) > 0
+
+    # Another replica finishes a sync
+    with database.engine.begin() as conn:
+        conn.execute(update(database.SyncState).values(
+            dataset_version=database.SyncState.dataset_version + 1
+        ))
+    client.portal.call(health.monitor.stop)
+    assert client.portal.call(coordination.refresh_dataset_version) == before + 2
+    assert cache.current_version() == before + 2
+    assert len(cache.response_cache) == 0
+
+
+@pytest.mark.integration
+def test_partial_sync_publishes_new_version(client, mocker, run_sync):
+    """
+    Integration test:
+    A sync failing after some batches were committed still publishes a new
+    version (cached bodies and ETags would describe the old rows); one
+    failing before any write does not.
+    """
+    from app import main
+
+    mocker.patch("app.constants.UPSERT_BATCH_SIZE", 1) # One batch per page
+    mocker.patch("app.main.resilient_request", side_effect=[
+        {"info": {"next": f"page-{char_id + 1}" if char_id == 1 else None},
+         "results": [{"id": char_id, "name": "Rick", "species": "Human",
+                      "status": "Alive", "origin": {"name": "Earth (C-137)"}}]}
+        for char_id in (1, 2)
+    ])
+    real_upsert = database.bulk_upsert_characters
+    calls = []
+
+    def upsert_then_fail(db, batch, **kwargs):
+        calls.append(batch)
+        if len(calls) > 1:
+            raise RuntimeError("DB went away")
+        return real_upsert(db, batch, **kwargs)
+
+    mocker.patch.object(
+        main.database, "bulk_upsert_characters", side_effect=upsert_then_fail
+    )
+    before = cache.current_version()
+    assert run_sync()["status"] == "failed"
+    assert cache.current_version() == before + 1
+
+    mocker.patch("app.main.resilient_request", side_effect=RuntimeError("down"))
+    assert run_sync()["status"] == "failed"
+    assert cache.current_version() == before + 1
+
+
+@pytest.mark.integration
+def test_etags_name_the_version_the_rows_were_read_at(client, mocker, run_sync):
+    """
+    Integration test:
+    A batch committed by another replica bumps the version with its rows.
+    Pages and uncached listings are tagged with the version they were read
+    at, so the old ETag no longer matches even before this replica adopts
+    the new version; reads racing a commit are retried.
+    """
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None}, "results": [RICK]
+    })
+    run_sync()
+    page = client.get("/api/v1/characters?limit=10")
+    listing = client.get("/api/v1/characters")
+
+    # Another replica's batch, not adopted here yet
+    with database.SessionLocal() as db:
+        database.bulk_upsert_characters(
+            db, [{"id": 1, "name": "Rick Prime"}],
+            before_commit=coordination.bump_dataset_version,
+        )
+    client.portal.call(health.monitor.stop)
+
+    response = client.get(
+        "/api/v1/characters?limit=10", headers={"If-None-Match": page.headers["etag"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["results"][0]["name"] == "Rick Prime"
+    assert response.headers["etag"] != page.headers["etag"]
+
+    # Cached listing: still the old body under the old ETag
+    assert client.get("/api/v1/characters").headers["etag"] == listing.headers["etag"]
+    cache.response_cache.clear()
+    response = client.get("/api/v1/characters")
+    assert response.json()[0]["name"] == "Rick Prime"
+    assert response.headers["etag"] != listing.headers["etag"]
+    assert cache.current_version() == coordination.adopt_published_version()
+
+    # A sync committing while a read runs: the read is retried
+    reads = []
+
+    async def read():
+        reads.append(1)
+        if len(reads) == 1:
+            with database.SessionLocal() as db:
+                coordination.bump_dataset_version(db)
+                db.commit()
+        return "body"
+
+    async def versioned():
+        async with database.AsyncSessionLocal() as db:
+            return await coordination.versioned_read(db, read)
+
+    version, body = client.portal.call(versioned)
+    assert len(reads) == 2
+    assert version == coordination.adopt_published_version()
@@ -0,0 +1,63 @@
+import pytest
+
+from app import health
+
+
+@pytest.mark.unit
+def test_circuit_breaker_opens_and_recovers(mocker):
+    """
+    Unit test:
+    The breaker opens after the failure threshold, goes half-open after the
+    reset timeout, and re-opens or closes on the next probe result.
+    """
+    clock = mocker.patch("app.health.time.monotonic", return_value=100.0)
+    breaker = health.CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    assert breaker.state == health.CLOSED
+    breaker.record_failure()
+    assert breaker.state == health.OPEN
+    assert not breaker.allow_request()
+
+    clock.return_value = 131.0
+    assert breaker.state == health.HALF_OPEN
+    assert breaker.allow_request()
+    breaker.record_failure() # A single failure while half-open re-opens
+    assert breaker.state == health.OPEN
+
+    clock.return_value = 162.0
+    assert breaker.state == health.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == health.CLOSED
+
+
+@pytest.mark.integration
+def test_healthcheck_served_from_cache(client, mocker):
+    """
+    Integration test:
+    /healthcheck does not touch the DB while the cached result is fresh.
+    """
+    client.get("/healthcheck") # Primes the cache if no probe ran yet
+    check = mocker.patch("app.database.check_db_connection", return_value=False)
+
+    assert client.get("/healthcheck").status_code == 200
+    check.assert_not_called()
+
+
+@pytest.mark.integration
+def test_open_breaker_fails_reads_fast(client, mocker):
+    """
+    Integration test:
+    Once repeated probes fail, read endpoints that need the DB answer 503
+    immediately, while cached listings keep being served.
+    """
+    client.portal.call(health.monitor.stop) # No racing background probes
+    mocker.patch("app.database.check_db_connection", return_value=False)
+    for _ in range(health.breaker.failure_threshold):
+        client.portal.call(health.monitor.probe_once)
+
+    assert client.get("/api/v1/characters").status_code == 200 # Warm cache
+    response = client.get("/api/v1/characters?limit=10")
+    assert response.status_code == 503
+    assert response.json() == {"detail": "Database unavailable (circuit open)"}
+    assert client.get("/healthcheck").status_code == 503
@@ -14,10 +14,15 @@ def test_healthcheck_db_failure(client, mocker):
     """
     Unit test:
     Checks /healthcheck when the DB is "down".
-    We mock the 'check_db_connection' function to return False.
+    We mock the 'check_db_connection' function to return False and let the
+    background health monitor run one probe (the endpoint reads its cache).
     """
+    from app import health
+
     # Mock the return value of the DB check function to False
+    client.portal.call(health.monitor.stop) # No racing background probes
     mocker.patch("app.database.check_db_connection", return_value=False)
+    client.portal.call(health.monitor.probe_once)
 
     response = client.get("/healthcheck")
 
@@ -53,7 +58,7 @@ def test_healthcheck_success(client):
 
 
 @pytest.mark.integration
-def test_full_sync_and_get_flow(client, mocker):
+def test_full_sync_and_get_flow(client, mocker, run_sync):
     """
     Integration test (End-to-End):
     1. Mocks the external "Rick and Morty" API.
@@ -111,12 +116,14 @@ def test_full_sync_and_get_flow(client, mocker):
     mocker.patch("app.main.resilient_request", side_effect=mock_resilient_request)
 
     # --- 2. Call /sync ---
-    response_sync = client.post("/sync")
-    assert response_sync.status_code == 200
+    job = run_sync()
+    assert job["status"] == "succeeded"
+    assert job["pages_done"] == 2
+    assert job["rows_written"] == 2
     # Out of 5 characters, only 2 (id: 1, id: 5) are valid
-    # FIX: Wrapped long string for E501
-    assert response_sync.json() == {
-        "message": "Data synced successfully: 2 characters processed"
+    assert job["result"] == {
+        "processed": 2, "inserted": 2, "updated": 0, "unchanged": 0,
+        "deleted": 0
     }
 
     # --- 3. Call /api/v1/characters (no sorting) ---
@@ -137,7 +144,7 @@ def test_full_sync_and_get_flow(client, mocker):
 
 
 @pytest.mark.integration
-def test_sync_upsert_logic(client, mocker):
+def test_sync_upsert_logic(client, mocker, run_sync):
     """
     Integration test:
     Checks that calling /sync again updates (UPSERTs) data,
@@ -153,7 +160,7 @@ def test_sync_upsert_logic(client, mocker):
         ]
     }
     mocker.patch("app.main.resilient_request", return_value=initial_data)
-    client.post("/sync")
+    run_sync()
 
     # Check
     response_v1 = client.get("/api/v1/characters")
@@ -170,7 +177,7 @@ def test_sync_upsert_logic(client, mocker):
         ]
     }
     mocker.patch("app.main.resilient_request", return_value=updated_data)
-    client.post("/sync")
+    run_sync()
 
     # --- 3. Check the result ---
     response_v2 = client.get("/api/v1/characters")
@@ -180,3 +187,433 @@ def test_sync_upsert_logic(client, mocker):
     assert len(data_v2) == 1
     # But the name has been updated
     assert data_v2[0]["name"] == "Old Rick"
+
+
+@pytest.mark.integration
+def test_sync_concurrent_page_fan_out(client, mocker, run_sync):
+    """
+    Integration test:
+    When the upstream reports 'info.pages', the remaining pages are fetched
+    in parallel but merged in page order (the last page wins on conflicts),
+    even if an earlier page is the slowest to arrive.
+    """
+    import time
+
+    def page(results, pages=3):
+        return {"info": {"pages": pages, "next": None}, "results": results}
+
+    pages = {
+        constants.EXTERNAL_API_URL: page([
+            {"id": 1, "name": "Rick", "species": "Human", "status": "Alive",
+             "origin": {"name": "Earth (C-137)"}},
+        ]),
+        f"{constants.EXTERNAL_API_URL}?page=2": page([
+            {"id": 7, "name": "Slow Page Morty", "species": "Human",
+             "status": "Alive", "origin": {"name": "Earth (C-137)"}},
+        ]),
+        f"{constants.EXTERNAL_API_URL}?page=3": page([
+            {"id": 7, "name": "Last Page Morty", "species": "Human",
+             "status": "Alive", "origin": {"name": "Earth (C-137)"}},
+        ]),
+    }
+    called = []
+
+    def mock_resilient_request(url: str):
+        called.append(url)
+        if url.endswith("page=2"):
+            time.sleep(0.05) # Page 2 arrives after page 3
+        return pages[url]
+
+    mocker.patch("app.main.resilient_request", side_effect=mock_resilient_request)
+
+    assert run_sync()["status"] == "succeeded"
+    assert sorted(called) == sorted(pages)
+
+    data = client.get("/api/v1/characters?sort_by=id").json()
+    assert [c["name"] for c in data] == ["Rick", "Last Page Morty"]
+
+
+@pytest.mark.integration
+def test_bulk_upsert_characters_batches(client):
+    """
+    Integration test:
+    The bulk write path inserts new rows, updates existing ones and keeps
+    the last version of an id that appears twice in the same batch.
+    """
+    from app import database
+
+    def row(char_id, name):
+        return {"id": char_id, "name": name, "species": "Human",
+                "status": "Alive", "origin_name": "Earth (C-137)",
+                "is_earth_origin": True}
+
+    db = database.SessionLocal()
+    try:
+        written = database.bulk_upsert_characters(
+            db, [row(1, "Rick"), row(2, "Morty"), row(3, "Summer")], batch_size=2
+        )
+        assert written == 3
+
+        database.bulk_upsert_characters(
+            db, [row(2, "Evil Morty"), row(2, "Mr. Morty"), row(4, "Beth")]
+        )
+        names = dict(db.query(database.Character.id, database.Character.name))
+    finally:
+        db.close()
+
+    assert names == {1: "Rick", 2: "Mr. Morty", 3: "Summer", 4: "Beth"}
+
+
+@pytest.mark.integration
+def test_incremental_sync_counts_and_tombstones(client, mocker, run_sync):
+    """
+    Integration test:
+    A second sync only writes changed rows, reports per-outcome counts and,
+    when enabled, tombstones characters that disappeared upstream.
+    """
+    from app import main
+
+    def character(char_id, name):
+        return {"id": char_id, "name": name, "species": "Human",
+                "status": "Alive", "origin": {"name": "Earth (C-137)"}}
+
+    first = {"info": {"next": None},
+             "results": [character(1, "Rick"), character(2, "Morty"),
+                         character(3, "Summer")]}
+    mocker.patch("app.main.resilient_request", return_value=first)
+    assert run_sync()["result"]["inserted"] == 3
+
+    second = {"info": {"next": None},
+              "results": [character(1, "Rick"), character(2, "Evil Morty"),
+                          character(4, "Beth")]}
+    mocker.patch("app.main.resilient_request", return_value=second)
+    upsert = mocker.spy(main.database, "bulk_upsert_characters")
+    mocker.patch("app.constants.SYNC_TOMBSTONE_MISSING", True)
+
+    body = run_sync()["result"]
+    assert {k: body[k] for k in ("inserted", "updated", "unchanged", "deleted")} == {
+        "inserted": 1, "updated": 1, "unchanged": 1, "deleted": 1
+    }
+    # Only the new and the changed row were written
+    written = upsert.call_args.args[1]
+    assert sorted(row["id"] for row in written) == [2, 4]
+
+    names = [c["name"] for c in client.get("/api/v1/characters?sort_by=id").json()]
+    assert names == ["Rick", "Evil Morty", "Beth"]
+
+
+@pytest.mark.integration
+def test_sync_runs_in_background_and_coalesces(client, mocker, run_sync):
+    """
+    Integration test:
+    POST /sync returns a job id right away; a second trigger while the job
+    is running joins it instead of starting another ingestion.
+    """
+    import threading
+
+    release = threading.Event()
+
+    def blocking_request(url: str):
+        release.wait(timeout=5)
+        return {"info": {"next": None}, "results": []}
+
+    mocker.patch("app.main.resilient_request", side_effect=blocking_request)
+
+    first = client.post("/sync")
+    second = client.post("/sync")
+    assert first.status_code == second.status_code == 202
+    assert first.json()["message"] == "Sync started"
+    assert second.json()["message"] == "Sync already running"
+    assert second.json()["job_id"] == first.json()["job_id"]
+
+    # The API keeps answering while the sync is blocked upstream
+    assert client.get("/api/v1/characters").status_code == 200
+
+    release.set()
+    assert run_sync()["status"] == "succeeded"
+    assert client.get("/sync/unknown-job").status_code == 404
+
+
+@pytest.mark.integration
+def test_sync_job_status_shared_across_workers(client):
+    """
+    Integration test:
+    A job run by another worker's manager is reported by this worker from
+    the shared job table, while it runs and once it has finished.
+    """
+    import threading
+    import time
+
+    from app import main, sync_jobs
+
+    release = threading.Event()
+
+    def run_job(job):
+        job.record_page()
+        release.wait(timeout=5)
+        return {"processed": 0}
+
+    other = sync_jobs.SyncJobManager(run_job, replica="other-pod:2")
+    job, _ = other.submit()
+    client.portal.call(other.register, job)
+    assert main.sync_job_manager.get(job.id) is None
+
+    def wait_for(predicate):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            status = client.get(f"/sync/{job.id}").json()
+            if predicate(status):
+                return status
+            time.sleep(0.01)
+        raise AssertionError(f"Unexpected job status: {status}")
+
+    wait_for(lambda status: status["status"] == "running"
+             and status["pages_done"] == 1)
+    release.set()
+    status = wait_for(lambda status: status["status"] == "succeeded")
+    assert status["result"] == {"processed": 0}
+    assert status["elapsed_seconds"] >= 0
+    other.shutdown()
+
+
+@pytest.mark.integration
+def test_characters_response_cache(client, mocker, run_sync):
+    """
+    Integration test:
+    Listings are served from the response cache until a sync bumps the
+    dataset version.
+    """
+    from app import main
+
+    render = mocker.spy(main, "render_characters")
+    assert client.get("/api/v1/characters?sort_by=id").json() == []
+    assert render.call_count == 0 # Warmed during startup
+
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None},
+        "results": [{"id": 1, "name": "Rick", "species": "Human",
+                     "status": "Alive", "origin": {"name": "Earth (C-137)"}}]
+    })
+    run_sync()
+
+    assert len(client.get("/api/v1/characters?sort_by=id").json()) == 1
+    assert len(client.get("/api/v1/characters?sort_by=id").json()) == 1
+    assert render.call_count == 1
+
+
+@pytest.mark.unit
+def test_response_cache_is_bounded():
+    """
+    Unit test:
+    The response cache evicts the least recently used entry.
+    """
+    from app.cache import ResponseCache
+
+    response_cache = ResponseCache(max_entries=2)
+    response_cache.put((1, None), b"[]")
+    response_cache.put((1, "id"), b"[1]")
+    assert response_cache.get((1, None)) == b"[]" # (1, None) is now most recent
+    response_cache.put((1, "name"), b"[2]")
+
+    assert len(response_cache) == 2
+    assert response_cache.get((1, "id")) is None
+    assert response_cache.get((1, None)) == b"[]"
+
+
+@pytest.mark.integration
+def test_characters_keyset_pagination(client, mocker, run_sync):
+    """
+    Integration test:
+    'limit' + 'cursor' walk the listing page by page in sort order, using
+    id as the tiebreaker for equal names, and reject foreign cursors.
+    """
+    import base64
+    import json
+
+    names = {1: "Rick", 2: "Morty", 3: "Rick", 4: "Beth", 5: "Morty"}
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None},
+        "results": [{"id": char_id, "name": name, "species": "Human",
+                     "status": "Alive", "origin": {"name": "Earth (C-137)"}}
+                    for char_id, name in names.items()]
+    })
+    run_sync()
+
+    def walk(sort_by):
+        seen, cursor = [], None
+        while True:
+            params = {"sort_by": sort_by, "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            page = client.get("/api/v1/characters", params=params).json()
+            assert len(page["results"]) <= 2
+            seen += [c["id"] for c in page["results"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return seen
+
+    assert walk("id") == [1, 2, 3, 4, 5]
+    assert walk("name") == [4, 2, 5, 1, 3]
+
+    id_cursor = client.get("/api/v1/characters?sort_by=id&limit=1").json()
+    response = client.get(
+        "/api/v1/characters",
+        params={"sort_by": "name", "cursor": id_cursor["next_cursor"]}
+    )
+    assert response.status_code == 400
+
+    # Cursors that decode but carry the wrong key types
+    for sort_by, key in [(None, ["x"]), (None, [True]), ("name", [1, 2]),
+                         ("name", ["Rick", "3"]), ("id", "1")]:
+        cursor = base64.urlsafe_b64encode(
+            json.dumps({"sort_by": sort_by, "key": key}).encode()
+        ).decode()
+        params = {"cursor": cursor} if sort_by is None else {
+            "sort_by": sort_by, "cursor": cursor
+        }
+        response = client.get("/api/v1/characters", params=params)
+        assert response.status_code == 400, (sort_by, key)
+
+
+@pytest.mark.integration
+def test_export_characters_streams_ndjson_and_csv(client, mocker, run_sync):
+    """
+    Integration test:
+    The export endpoint streams every filtered character as NDJSON or CSV.
+    """
+    import csv
+    import json
+
+    mocker.patch("app.constants.EXPORT_CHUNK_SIZE", 2) # Force several chunks
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None},
+        "results": [{"id": char_id, "name": f"Rick {char_id}", "species": "Human",
+                     "status": "Alive", "origin": {"name": "Earth (C-137)"}}
+                    for char_id in range(1, 6)]
+    })
+    run_sync()
+
+    response = client.get("/api/v1/characters/export?format=ndjson")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [1, 2, 3, 4, 5]
+    assert rows[0] == client.get("/api/v1/characters?sort_by=id").json()[0]
+
+    response = client.get("/api/v1/characters/export?format=csv")
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert [row["name"] for row in rows] == [f"Rick {i}" for i in range(1, 6)]
+
+    assert client.get("/api/v1/characters/export?format=xml").status_code == 400
+
+
+@pytest.mark.unit
+def test_async_database_url_mapping():
+    """
+    Unit test:
+    Sync DATABASE_URLs are mapped to their async drivers.
+    """
+    from app.database import async_database_url
+
+    assert async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    assert async_database_url(
+        "postgresql://user:secret@db:5432/app?sslmode=require"
+    ) == "postgresql+asyncpg://user:secret@db:5432/app?ssl=require"
+
+
+@pytest.mark.unit
+def test_pool_instrumentation(tmp_path):
+    """
+    Unit test:
+    Instrumented pools report checkouts, new connections and checkout waits.
+    """
+    from prometheus_client import REGISTRY
+    from sqlalchemy import create_engine, text
+
+    from app import database, metrics_setup
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=database.InstrumentedQueuePool
+    )
+    metrics_setup.instrument_engine(engine, "sync")
+
+    def sample(name):
+        return REGISTRY.get_sample_value(name, {"pool": "sync"}) or 0
+
+    created = sample("db_pool_connections_created_total")
+    waits = sample("db_pool_checkout_wait_seconds_count")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert sample("db_pool_checked_out_connections") == 1
+    assert sample("db_pool_checked_out_connections") == 0
+    assert sample("db_pool_connections_created_total") == created + 1
+    assert sample("db_pool_checkout_wait_seconds_count") == waits + 1
+    engine.dispose()
+
+
+@pytest.mark.integration
+def test_fast_serialization_matches_orm_output(client, mocker, run_sync):
+    """
+    Integration test:
+    The column-tuple + orjson path produces byte-for-byte the JSON that
+    FastAPI's jsonable_encoder produced for the ORM objects.
+    """
+    from fastapi.encoders import jsonable_encoder
+    from starlette.responses import JSONResponse
+
+    from app import database
+
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None},
+        "results": [{"id": 1, "name": "Rick Sánchez \"C-137\"", "species": "Human",
+                     "status": "Alive", "origin": {"name": "Earth (C-137)"}}]
+    })
+    run_sync()
+
+    db = database.SessionLocal()
+    try:
+        orm_rows = db.query(*database.PUBLIC_COLUMNS).all()
+        expected = JSONResponse(
+            content=jsonable_encoder([row._asdict() for row in orm_rows])
+        ).body
+    finally:
+        db.close()
+
+    assert client.get("/api/v1/characters").content == expected
+
+
+@pytest.mark.integration
+def test_characters_conditional_get(client, mocker, run_sync):
+    """
+    Integration test:
+    A matching If-None-Match returns 304 without rendering; the ETag
+    changes with the query parameters and after every sync that writes.
+    """
+    from app import main
+
+    first = client.get("/api/v1/characters?sort_by=name")
+    etag = first.headers["etag"]
+    assert etag != client.get("/api/v1/characters?sort_by=id").headers["etag"]
+
+    render = mocker.spy(main, "render_characters")
+    response = client.get(
+        "/api/v1/characters?sort_by=name",
+        headers={"If-None-Match": f'"other", W/{etag}'}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    render.assert_not_called()
+
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None},
+        "results": [{"id": 1, "name": "Rick", "species": "Human",
+                     "status": "Alive", "origin": {"name": "Earth (C-137)"}}]
+    })
+    run_sync()
+    response = client.get(
+        "/api/v1/characters?sort_by=name", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
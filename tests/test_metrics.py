@@ -0,0 +1,65 @@
+import pytest
+from prometheus_client import REGISTRY
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.integration
+def test_metrics_labelled_by_route_template(client):
+    """
+    Integration test:
+    Latency and errors are labelled with the matched route template, not the
+    raw path, and unknown paths share a single label.
+    """
+    template = {"method": "GET", "endpoint": "/sync/{job_id}"}
+    before = sample("http_request_duration_seconds_count", **template)
+    errors = sample("http_errors_total", status_code="404", **template)
+
+    client.get("/sync/job-a")
+    client.get("/sync/job-b")
+    client.get("/no/such/path")
+
+    assert sample("http_request_duration_seconds_count", **template) == before + 2
+    assert sample("http_errors_total", status_code="404", **template) == errors + 2
+    assert sample(
+        "http_request_duration_seconds_count", method="GET", endpoint="<unmatched>"
+    ) >= 1
+    assert sample(
+        "http_request_duration_seconds_count", method="GET", endpoint="/sync/job-a"
+    ) == 0
+    assert sample("http_requests_in_progress", method="GET") == 0
+
+
+@pytest.mark.integration
+def test_metrics_record_streamed_response_size(client):
+    """
+    Integration test:
+    Response sizes include every chunk of a streaming response.
+    """
+    labels = {"method": "GET", "endpoint": "/api/v1/characters/export"}
+    before = sample("http_response_size_bytes_sum", **labels)
+
+    response = client.get("/api/v1/characters/export?format=csv")
+
+    assert sample("http_response_size_bytes_sum", **labels) == (
+        before + len(response.content)
+    )
+
+
+@pytest.mark.unit
+def test_scrape_registry_multiprocess_mode(monkeypatch, tmp_path):
+    """
+    Unit test:
+    With PROMETHEUS_MULTIPROC_DIR set, /metrics aggregates the per-worker
+    files through a fresh registry instead of the in-process one.
+    """
+    from app import metrics_setup
+
+    assert metrics_setup.scrape_registry() is REGISTRY
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    registry = metrics_setup.scrape_registry()
+    assert registry is not REGISTRY
+    assert list(registry.collect()) == [] # No worker files written yet
@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app import database, main, migrations
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """
+    A database created before fingerprints, listing indexes and the last
+    sync time existed.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE characters (id INTEGER PRIMARY KEY, name VARCHAR, "
+            "species VARCHAR, status VARCHAR, origin_name VARCHAR, "
+            "is_earth_origin BOOLEAN)"
+        ))
+        conn.execute(text(
+            "INSERT INTO characters VALUES "
+            "(1, 'Rick', 'Human', 'Alive', 'Earth (C-137)', 1)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE sync_state (name VARCHAR PRIMARY KEY, "
+            "dataset_version BIGINT NOT NULL, lock_holder VARCHAR, "
+            "lock_expires_at FLOAT)"
+        ))
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.integration
+def test_migrations_upgrade_existing_table(legacy_engine):
+    """
+    Integration test:
+    Pending migrations add the new columns and indexes to an existing table,
+    keep its rows, and are recorded so a second run is a no-op.
+    """
+    assert migrations.run_migrations(legacy_engine) == [1, 2, 3]
+    assert migrations.run_migrations(legacy_engine) == []
+
+    inspector = inspect(legacy_engine)
+    columns = {column["name"] for column in inspector.get_columns("characters")}
+    assert {"content_hash", "is_deleted"} <= columns
+    indexes = {index["name"] for index in inspector.get_indexes("characters")}
+    assert {"ix_characters_listing_name", "ix_characters_listing_id"} <= indexes
+    columns = {column["name"] for column in inspector.get_columns("sync_state")}
+    assert "last_synced_at" in columns
+
+    with legacy_engine.connect() as conn:
+        row = conn.execute(text("SELECT name, is_deleted FROM characters")).one()
+    assert tuple(row) == ("Rick", 0)
+
+
+@pytest.mark.integration
+def test_migrations_on_fresh_schema_are_noops(tmp_path):
+    """
+    Integration test:
+    On a database built by create_all, migrations only get recorded.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    database.Base.metadata.create_all(bind=engine)
+
+    assert migrations.run_migrations(engine) == [1, 2, 3]
+    engine.dispose()
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("sort_by", ["name", "id"])
+def test_listing_query_uses_ordered_index_scan(legacy_engine, sort_by):
+    """
+    Integration test:
+    The listing query walks a listing index in order (no temp sort B-tree).
+    """
+    migrations.run_migrations(legacy_engine)
+    query = main.characters_query().order_by(
+        *([database.Character.name] if sort_by == "name" else []),
+        database.Character.id,
+    )
+    sql = str(query.compile(
+        dialect=legacy_engine.dialect, compile_kwargs={"literal_binds": True}
+    ))
+    with legacy_engine.connect() as conn:
+        plan = " ".join(
+            row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+        )
+
+    assert f"USING INDEX ix_characters_listing_{sort_by}" in plan
+    assert "TEMP B-TREE" not in plan
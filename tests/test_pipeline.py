@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from app import pipeline
+
+
+def produce(out, items, produced):
+    for item in items:
+        out.put(item, stage="test")
+        produced.append(item)
+
+
+@pytest.mark.unit
+def test_bounded_channel_applies_backpressure():
+    """
+    Unit test:
+    A producer can only run 'queue_size' items ahead of its consumer, and
+    everything arrives in order once the consumer catches up.
+    """
+    produced, received = [], []
+    release = threading.Event()
+
+    with pipeline.Pipeline(queue_size=2) as stages:
+        channel = stages.channel("test")
+        stages.spawn("produce", produce, channel, range(10), produced)
+
+        for item in channel:
+            if not release.is_set():
+                # Consumer stalled on its first item: the producer fills the
+                # queue and blocks
+                threading.Event().wait(0.3)
+                assert len(produced) <= 3
+                release.set()
+            received.append(item)
+
+    assert received == list(range(10))
+
+
+@pytest.mark.unit
+def test_stage_failure_aborts_pipeline():
+    """
+    Unit test:
+    An exception in a producer stage stops the consumer and is re-raised
+    from the pipeline.
+    """
+    def failing(out):
+        out.put(1, stage="test")
+        raise RuntimeError("upstream exploded")
+
+    received = []
+    with pytest.raises(RuntimeError, match="upstream exploded"):
+        with pipeline.Pipeline(queue_size=2) as stages:
+            channel = stages.channel("test")
+            stages.spawn("failing", failing, channel)
+            for item in channel:
+                received.append(item)
+
+    assert received in ([], [1])
+
+
+@pytest.mark.unit
+def test_page_fetches_follow_the_consumer(mocker):
+    """
+    Unit test:
+    Parallel page fetches stay 'concurrency' pages ahead of the consumer,
+    and closing the page stream cancels the pages not yet started.
+    """
+    from app import constants, main
+
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return {"info": {"pages": 20, "next": None}, "results": []}
+
+    mocker.patch("app.main.resilient_request", side_effect=fetch)
+    pages = main.fetch_character_pages(concurrency=2)
+    for _ in range(3):
+        next(pages)
+    threading.Event().wait(0.1)
+    # First page, two consumed from the pool, two more in flight
+    assert len(fetched) == 5
+
+    pages.close()
+    threading.Event().wait(0.1)
+    assert len(fetched) == 5
+    assert fetched[0] == constants.EXTERNAL_API_URL
@@ -0,0 +1,118 @@
+import pstats
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+
+@pytest.fixture
+def profiling_on(mocker, tmp_path):
+    mocker.patch("app.constants.PROFILING_ENABLED", True)
+    mocker.patch("app.constants.PROFILING_DIR", str(tmp_path))
+    return tmp_path
+
+
+def phase_count(phase):
+    return REGISTRY.get_sample_value(
+        "app_request_phase_duration_seconds_count",
+        {"endpoint": "/api/v1/characters", "phase": phase},
+    ) or 0
+
+
+def server_timing_phases(response):
+    return [entry.split(";")[0] for entry in
+            response.headers["server-timing"].split(", ")]
+
+
+@pytest.mark.integration
+def test_listing_reports_phase_timings(client):
+    """
+    Integration test:
+    A cache miss is timed as db/hydrate/encode, a hit as a cache lookup;
+    both in the Server-Timing header and the phase histogram.
+    """
+    before = phase_count("db")
+    miss = client.get("/api/v1/characters?sort_by=name&limit=5")
+    assert server_timing_phases(miss) == ["db", "hydrate", "encode", "total"]
+    assert phase_count("db") == before + 1
+
+    hit = client.get("/api/v1/characters")
+    assert server_timing_phases(hit) == ["cache", "total"]
+
+
+@pytest.mark.integration
+def test_profiling_disabled_by_default(client):
+    """
+    Integration test:
+    Without PROFILING_ENABLED the header is ignored and artifacts are hidden.
+    """
+    response = client.get("/api/v1/characters", headers={"X-Profile": "1"})
+    assert "x-profile-id" not in response.headers
+    assert client.get("/debug/profiles").status_code == 404
+
+
+@pytest.mark.integration
+def test_request_profile_downloadable(client, profiling_on):
+    """
+    Integration test:
+    A request with X-Profile gets an X-Profile-Id; the artifact downloads
+    as a pstats dump or a text report.
+    """
+    response = client.get("/api/v1/characters", headers={"X-Profile": "1"})
+    profile_id = response.headers["x-profile-id"]
+
+    listing = client.get("/debug/profiles").json()
+    assert listing[0]["profile_id"] == profile_id
+    assert listing[0]["label"] == "GET /api/v1/characters"
+
+    artifact = client.get(f"/debug/profiles/{profile_id}")
+    assert artifact.status_code == 200
+    dump = profiling_on / "downloaded.prof"
+    dump.write_bytes(artifact.content)
+    assert pstats.Stats(str(dump)).total_calls > 0
+
+    text = client.get(f"/debug/profiles/{profile_id}?format=text")
+    assert "function calls" in text.text
+    assert client.get("/debug/profiles/not-a-profile").status_code == 404
+
+
+@pytest.mark.integration
+def test_profiling_token_required(client, profiling_on, mocker):
+    """
+    Integration test:
+    With PROFILING_TOKEN set, only requests carrying it are profiled.
+    """
+    mocker.patch("app.constants.PROFILING_TOKEN", "s3cret")
+
+    response = client.get("/api/v1/characters", headers={"X-Profile": "guess"})
+    assert "x-profile-id" not in response.headers
+    assert client.get("/debug/profiles").status_code == 404
+
+    response = client.get("/api/v1/characters", headers={"X-Profile": "s3cret"})
+    assert "x-profile-id" in response.headers
+    assert client.get(
+        "/debug/profiles", headers={"X-Profile": "s3cret"}
+    ).status_code == 200
+
+
+@pytest.mark.integration
+def test_profiled_sync_job(client, profiling_on, mocker):
+    """
+    Integration test:
+    X-Profile on POST /sync profiles the background job; the job status
+    reports its profile id and per-phase timings.
+    """
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None}, "results": []
+    })
+    job_id = client.post("/sync", headers={"X-Profile": "1"}).json()["job_id"]
+    for _ in range(500):
+        job = client.get(f"/sync/{job_id}").json()
+        if job["status"] == "succeeded":
+            break
+        time.sleep(0.01)
+
+    assert job["status"] == "succeeded"
+    # Nothing written, so no new version to publish
+    assert set(job["phases_ms"]) == {"load_fingerprints", "pipeline"}
+    assert client.get(f"/debug/profiles/{job['profile_id']}").status_code == 200
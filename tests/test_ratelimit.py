@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app import database, ratelimit
+from app.database import RateLimitCounter
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+@pytest.mark.integration
+def test_replicas_share_one_limit(client, mocker):
+    """
+    Integration test:
+    Replicas on one database never admit more than the limit together,
+    whether their hits interleave or arrive in one burst; decisions make
+    no sync round-trip and blocks are claimed ahead.
+    """
+    mocker.patch("app.constants.RATE_LIMIT_LEASE_MIN", 4)
+    replicas = [ratelimit.DatabaseStorage(), ratelimit.DatabaseStorage()]
+    claims = sample("app_rate_limit_lease_claims_total", {"result": "ok"})
+    sync_engine = mocker.patch.object(database, "engine")
+
+    admitted = [
+        client.portal.call(replica.hit, "LIMITER/test", 20, 3600)
+        for _ in range(20)
+        for replica in replicas
+    ]
+    sync_engine.begin.assert_not_called()
+    sync_engine.connect.assert_not_called()
+    assert 16 <= sum(admitted) <= 20
+    assert admitted[:16] == [True] * 16
+    # Blocks of 4; once the window is full, rejections are local
+    assert sample("app_rate_limit_lease_claims_total", {"result": "ok"}) - claims <= 8
+
+    # Claimed positions (used or not) are in the shared counter
+    mocker.stopall()
+    assert replicas[0].get_sliding_window("LIMITER/test", 3600)[2] >= 20
+
+
+@pytest.mark.integration
+def test_first_hits_wait_for_their_claim(client):
+    """
+    Integration test:
+    New keys are not admitted on credit: 5 replicas bursting 25 hits at a
+    5/hour limit admit 5, and a replica started after the window is full
+    admits none.
+    """
+    replicas = [ratelimit.DatabaseStorage() for _ in range(5)]
+
+    async def burst():
+        return await asyncio.gather(*(
+            replica.hit("LIMITER/burst", 5, 3600)
+            for _ in range(5)
+            for replica in replicas
+        ))
+
+    assert sum(client.portal.call(burst)) == 5
+
+    late = ratelimit.DatabaseStorage()
+    assert not any(
+        client.portal.call(late.hit, "LIMITER/burst", 5, 3600) for _ in range(3)
+    )
+
+
+@pytest.mark.integration
+def test_failed_claims_limit_per_process(client, mocker):
+    """
+    Integration test:
+    While the shared counters are unreachable, hits are still decided,
+    limited per process, and check() reports the failure.
+    """
+    mocker.patch.object(database, "async_engine", mocker.Mock()).begin.side_effect = (
+        OperationalError("BEGIN", {}, Exception("database is down"))
+    )
+    storage = ratelimit.DatabaseStorage()
+
+    admitted = [
+        client.portal.call(storage.hit, "LIMITER/down", 5, 60) for _ in range(6)
+    ]
+    assert admitted == [True] * 5 + [False]
+    assert not storage.check()
+    assert sample("app_rate_limit_lease_claims_total", {"result": "error"}) >= 1
+
+
+@pytest.mark.integration
+def test_endpoint_limit_uses_shared_storage(client):
+    """
+    Integration test:
+    Route limits are counted in the shared table and every decision is
+    timed; the 6th export within a minute is rejected.
+    """
+    allowed = sample("app_rate_limit_decision_seconds_count", {"outcome": "allowed"})
+    limited = sample("app_rate_limit_decision_seconds_count", {"outcome": "limited"})
+
+    statuses = [
+        client.get("/api/v1/characters/export").status_code for _ in range(6)
+    ]
+    assert statuses == [200] * 5 + [429]
+    assert sample(
+        "app_rate_limit_decision_seconds_count", {"outcome": "allowed"}
+    ) == allowed + 5
+    assert sample(
+        "app_rate_limit_decision_seconds_count", {"outcome": "limited"}
+    ) == limited + 1
+
+    with database.SessionLocal() as db:
+        assert db.scalar(select(func.sum(RateLimitCounter.hits))) >= 5
@@ -0,0 +1,113 @@
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+from tenacity import RetryError
+
+from app import scheduler, sync_jobs, upstream
+
+
+def finished_job(status, result=None, exception=None):
+    job = sync_jobs.SyncJob()
+    job.status = status
+    job.result = result
+    job.exception = exception
+    return job
+
+
+def counts(changed=0):
+    return {"processed": 5, "inserted": changed, "updated": 0, "unchanged": 5,
+            "deleted": 0}
+
+
+@pytest.mark.unit
+def test_scheduler_backs_off_and_stretches_idle_interval(mocker):
+    """
+    Unit test:
+    Upstream 429/5xx failures and no-change syncs double the delay (capped);
+    a sync with changes or a healthy upstream resets it.
+    """
+    sched = scheduler.SyncScheduler(
+        mocker.Mock(), interval=60, jitter=0, max_interval=200
+    )
+    throttled = RetryError(mocker.Mock())
+    throttled.last_attempt.exception.return_value = (
+        upstream.UpstreamUnavailableError(429)
+    )
+
+    assert sched.next_delay(finished_job("succeeded", counts(changed=3))) == 60
+    assert sched.next_delay(finished_job("failed", exception=throttled)) == 120
+    assert sched.next_delay(finished_job("failed", exception=throttled)) == 200
+    # Other replica ran it: streaks are kept as they are
+    assert sched.next_delay(finished_job("skipped")) == 200
+    # Upstream healthy again, but nothing changed
+    assert sched.next_delay(finished_job("succeeded", counts())) == 120
+    assert sched.next_delay(finished_job("succeeded", counts())) == 200
+    assert sched.next_delay(finished_job("succeeded", counts(changed=1))) == 60
+    assert sched.next_delay(finished_job("failed", exception=ValueError())) == 60
+
+
+@pytest.mark.integration
+def test_scheduled_run_goes_through_job_manager(client, mocker):
+    """
+    Integration test:
+    A scheduled run submits a regular sync job, waits for it and records
+    its last-run metrics.
+    """
+    from app import main
+
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None}, "results": []
+    })
+    sched = scheduler.SyncScheduler(
+        main.sync_job_manager, interval=60, jitter=0.1, max_interval=600,
+        poll_interval=0.01,
+    )
+
+    job = client.portal.call(sched.run_once)
+
+    assert job.status == "succeeded"
+    assert main.sync_job_manager.get(job.id) is job
+    assert REGISTRY.get_sample_value(
+        "app_sync_schedule_last_run_timestamp_seconds"
+    ) > 0
+    # Nothing changed upstream: the next run is pushed out (2x, +/- 10%)
+    assert 108 <= sched.next_delay(job) <= 132
+
+
+@pytest.mark.integration
+def test_scheduled_run_skipped_after_recent_sync(client, mocker):
+    """
+    Integration test:
+    A scheduled run within one interval of any process's last successful
+    sync is skipped before taking the lock, without counting as idle; once
+    the interval has passed it syncs again.
+    """
+    from sqlalchemy import update
+
+    from app import coordination, database, main
+
+    fetch = mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None}, "results": []
+    })
+    lock = mocker.spy(coordination, "sync_lock")
+    sched = scheduler.SyncScheduler(
+        main.sync_job_manager, interval=60, jitter=0.1, max_interval=600,
+        poll_interval=0.01,
+    )
+
+    coordination.record_successful_sync() # Another replica just synced
+    job = client.portal.call(sched.run_once)
+    assert job.status == "skipped"
+    fetch.assert_not_called()
+    lock.assert_not_called()
+    assert 54 <= sched.next_delay(job) <= 66
+    assert sched.idle_runs == 0
+
+    with database.engine.begin() as conn:
+        conn.execute(update(database.SyncState).values(
+            last_synced_at=database.SyncState.last_synced_at - 60
+        ))
+    job = client.portal.call(sched.run_once)
+    assert job.status == "succeeded"
+    assert coordination.last_successful_sync() > time.time() - 5
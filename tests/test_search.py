@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app import cache, search
+
+
+def character(char_id, name):
+    return {"id": char_id, "name": name, "species": "Human", "status": "Alive",
+            "origin": {"name": "Earth (C-137)"}}
+
+
+@pytest.mark.unit
+def test_index_ranks_exact_prefix_word_and_substring():
+    """
+    Unit test:
+    Exact matches rank first, then name prefixes, word prefixes and plain
+    substrings; shorter names win ties. Queries are case-insensitive.
+    """
+    rows = [
+        {"id": 1, "name": "Rick Sanchez"},
+        {"id": 2, "name": "Rick"},
+        {"id": 3, "name": "Doofus Rick"},
+        {"id": 4, "name": "Patrick"},
+        {"id": 5, "name": "Morty Smith"},
+    ]
+    index = search.CharacterIndex(rows, version=1)
+
+    def ids(query, limit=10):
+        return [row["id"] for row in index.search(query, limit)]
+
+    assert ids("rick") == [2, 1, 3, 4]
+    assert ids("RICK", limit=2) == [2, 1]
+    assert ids("san") == [1]  # Word prefix
+    assert ids("atr") == [4]  # Substring via trigrams
+    assert ids("rick  sanchez ") == [1]
+    assert ids("r") == [2, 1, 3]  # Too short for substring matching
+    assert ids("zzz") == []
+
+
+@pytest.mark.integration
+def test_search_endpoint_follows_syncs(client, mocker, run_sync):
+    """
+    Integration test:
+    /search only returns characters of the filtered listing and picks up
+    renamed characters after the next sync.
+    """
+    alien = character(3, "Rick Alien")
+    alien["species"] = "Alien"
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None},
+        "results": [character(1, "Rick Sanchez"), character(2, "Morty"), alien],
+    })
+    run_sync()
+
+    response = client.get("/api/v1/characters/search?q=ric")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["query"] == "ric"
+    assert [row["id"] for row in body["results"]] == [1]
+    assert set(body["results"][0]) == {
+        "id", "name", "species", "status", "origin_name", "is_earth_origin"
+    }
+
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None},
+        "results": [character(1, "Evil Morty"), character(2, "Morty")],
+    })
+    run_sync()
+
+    names = [
+        row["name"]
+        for row in client.get("/api/v1/characters/search?q=morty").json()["results"]
+    ]
+    assert names == ["Morty", "Evil Morty"]
+    assert client.get("/api/v1/characters/search?q=").status_code == 422
+    assert client.get("/api/v1/characters/search?q=x&limit=0").status_code == 422
+
+
+@pytest.mark.integration
+def test_index_rebuilt_by_sync_not_by_searches(client, mocker, run_sync):
+    """
+    Integration test:
+    A sync leaves the index current for its new version; requests finding
+    it stale share one rebuild.
+    """
+    from app import main
+
+    mocker.patch("app.main.resilient_request", return_value={
+        "info": {"next": None}, "results": [character(1, "Rick Sanchez")],
+    })
+    run_sync()
+    assert search.index.version == cache.current_version()
+    assert len(search.index.search("rick", 10)) == 1
+
+    # Stale index (e.g. version adopted from another replica)
+    search.rebuild([], version=None)
+    rebuild = mocker.spy(search, "rebuild")
+
+    async def concurrent_searches():
+        return await asyncio.gather(
+            *(main.refresh_search_index() for _ in range(5))
+        )
+
+    indexes = client.portal.call(concurrent_searches)
+    assert rebuild.call_count == 1
+    assert all(index is indexes[0] for index in indexes)
@@ -0,0 +1,59 @@
+import pytest
+
+from app import upstream
+
+URL = "https://upstream.test/api/character"
+
+
+def fake_response(mocker, status_code, payload=None, headers=None):
+    response = mocker.Mock(status_code=status_code, headers=headers or {})
+    response.json.return_value = payload
+    response.content = upstream.json.dumps(payload).encode()
+    response.raise_for_status.return_value = None
+    return response
+
+
+@pytest.mark.unit
+def test_conditional_revalidation_reuses_cached_page(tmp_path, mocker):
+    """
+    Unit test:
+    A page served with an ETag is cached on disk; the next fetch sends
+    If-None-Match and a 304 answer returns the cached data without parsing.
+    """
+    client = upstream.UpstreamClient(pool_size=2, timeout=5, cache_dir=str(tmp_path))
+    payload = {"info": {"next": None}, "results": [{"id": 1}]}
+    first = fake_response(mocker, 200, payload, {"ETag": '"v1"'})
+    not_modified = fake_response(mocker, 304)
+    get = mocker.patch.object(
+        client.session, "get", side_effect=[first, not_modified]
+    )
+
+    assert client.get_json(URL, params={"page": 1}) == payload
+    assert get.call_args_list[0].kwargs["headers"] == {}
+
+    assert client.get_json(URL, params={"page": 1}) == payload
+    assert get.call_args_list[1].kwargs["headers"] == {"If-None-Match": '"v1"'}
+    not_modified.json.assert_not_called()
+
+    # A fresh client (new process) revalidates from the on-disk copy
+    restarted = upstream.UpstreamClient(2, 5, cache_dir=str(tmp_path))
+    mocker.patch.object(
+        restarted.session, "get", return_value=fake_response(mocker, 304)
+    )
+    assert restarted.get_json(URL, params={"page": 1}) == payload
+
+
+@pytest.mark.unit
+def test_transient_status_raises_retryable_error(tmp_path, mocker):
+    """
+    Unit test:
+    429/5xx surface as UpstreamUnavailableError so the retry policy kicks in.
+    """
+    client = upstream.UpstreamClient(pool_size=2, timeout=5, cache_dir=str(tmp_path))
+    mocker.patch.object(
+        client.session, "get", return_value=fake_response(mocker, 503)
+    )
+
+    with pytest.raises(upstream.UpstreamUnavailableError) as excinfo:
+        client.get_json(URL)
+    assert excinfo.value.status_code == 503